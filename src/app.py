@@ -1,8 +1,23 @@
-from flask import Flask, render_template, request, flash, redirect, url_for, jsonify
+import functools
+import hmac
+import threading
+
+import click
+from jinja2 import ChoiceLoader, ModuleLoader
+from flask import Flask, render_template, request, flash, redirect, url_for, jsonify, Response, stream_with_context
 import os
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.utils import secure_filename
 import uuid
-from datetime import datetime
+from datetime import datetime, date, timedelta
+
+from services import metadata_store, tracing
+from services.admission import AdmissionController, InMemoryRateLimiter, RedisRateLimiter
+from services.scheduler import FairScheduler, classify_upload
+
+# Processing, export and batch modules (and the dependencies they pull in)
+# are imported inside the views and commands that use them, so worker
+# startup and /health do not pay for them.
 
 # Create Flask app
 app = Flask(__name__)
@@ -11,11 +26,90 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
 # Configuration
 app.config['UPLOAD_FOLDER'] = 'uploads'
+app.config['DATABASE'] = os.environ.get('DATABASE', 'documents.db')
+app.config['EXTRACTION_FOLDER'] = os.environ.get('EXTRACTION_FOLDER', 'extractions')
+app.config['PRECOMPILED_TEMPLATES'] = os.environ.get('PRECOMPILED_TEMPLATES')
+app.config['TRACE_EXPORT_PATH'] = os.environ.get('TRACE_EXPORT_PATH')
+app.config['SLOW_JOB_PROFILE_SECONDS'] = float(os.environ['SLOW_JOB_PROFILE_SECONDS']) \
+    if os.environ.get('SLOW_JOB_PROFILE_SECONDS') else None
+app.config['PROFILE_FOLDER'] = os.environ.get('PROFILE_FOLDER', 'profiles')
+app.config['ADMIN_TOKEN'] = os.environ.get('ADMIN_TOKEN')  # required for /metrics/scheduler and /export
+app.config['PROCESSING_WORKERS'] = int(os.environ.get('PROCESSING_WORKERS', 2))
+# Below the worker count by default, so one submitter always leaves a worker free
+app.config['MAX_JOBS_IN_FLIGHT_PER_EMAIL'] = int(os.environ.get(
+    'MAX_JOBS_IN_FLIGHT_PER_EMAIL', max(1, app.config['PROCESSING_WORKERS'] - 1)))
+app.config['UPLOAD_RATE_PER_CLIENT'] = float(os.environ.get('UPLOAD_RATE_PER_CLIENT', 1.0))  # uploads/second
+app.config['UPLOAD_BURST_PER_CLIENT'] = int(os.environ.get('UPLOAD_BURST_PER_CLIENT', 10))
+app.config['MAX_CONCURRENT_UPLOADS_PER_CLIENT'] = int(os.environ.get('MAX_CONCURRENT_UPLOADS_PER_CLIENT', 4))
+app.config['MAX_CONCURRENT_UPLOADS'] = int(os.environ.get('MAX_CONCURRENT_UPLOADS', 32))
+app.config['MAX_PROCESSING_BACKLOG'] = int(os.environ.get('MAX_PROCESSING_BACKLOG', 1000))
+app.config['RATE_LIMIT_REDIS_URL'] = os.environ.get('RATE_LIMIT_REDIS_URL')
+app.config['TRUSTED_PROXY_HOPS'] = int(os.environ.get('TRUSTED_PROXY_HOPS', 0))  # 1 behind App Runner
 ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'tiff'}
 
+# Take the client address from X-Forwarded-For set by trusted proxies, so
+# per-client admission limits apply to clients rather than the proxy
+if app.config['TRUSTED_PROXY_HOPS'] > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_HOPS'],
+                            x_proto=app.config['TRUSTED_PROXY_HOPS'])
+
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+metadata_store.init_app(app)
+
+# Per-job tracing and the opt-in slow job profiler
+tracing.configure(export_path=app.config['TRACE_EXPORT_PATH'],
+                  profile_threshold=app.config['SLOW_JOB_PROFILE_SECONDS'],
+                  profile_folder=app.config['PROFILE_FOLDER'])
+
+# Use templates compiled at image build time (flask compile-templates), falling
+# back to the template folder for anything not precompiled
+if app.config['PRECOMPILED_TEMPLATES'] and os.path.isdir(app.config['PRECOMPILED_TEMPLATES']):
+    app.jinja_env.loader = ChoiceLoader([ModuleLoader(app.config['PRECOMPILED_TEMPLATES']),
+                                         app.jinja_env.loader])
+
+# Processing queue shared by upload requests and processing workers
+scheduler = FairScheduler(max_in_flight_per_tenant=app.config['MAX_JOBS_IN_FLIGHT_PER_EMAIL'])
+app.extensions['scheduler'] = scheduler
+_workers_lock = threading.Lock()
+
+# Upload admission control; token buckets are shared via Redis when configured
+if app.config['RATE_LIMIT_REDIS_URL']:
+    rate_limiter = RedisRateLimiter(app.config['RATE_LIMIT_REDIS_URL'],
+                                    app.config['UPLOAD_RATE_PER_CLIENT'],
+                                    app.config['UPLOAD_BURST_PER_CLIENT'])
+else:
+    rate_limiter = InMemoryRateLimiter(app.config['UPLOAD_RATE_PER_CLIENT'],
+                                       app.config['UPLOAD_BURST_PER_CLIENT'])
+admission = AdmissionController(rate_limiter,
+                                max_concurrent_per_client=app.config['MAX_CONCURRENT_UPLOADS_PER_CLIENT'],
+                                max_concurrent_total=app.config['MAX_CONCURRENT_UPLOADS'],
+                                max_backlog=app.config['MAX_PROCESSING_BACKLOG'],
+                                backlog=scheduler.pending)
+app.extensions['admission'] = admission
+
+def get_workers():
+    """Return the threads draining the processing queue, creating them on first use."""
+    with _workers_lock:
+        workers = app.extensions.get('workers')
+        if workers is None:
+            from services.worker import ProcessingWorkers
+            workers = ProcessingWorkers(app, scheduler, threads=app.config['PROCESSING_WORKERS'])
+            app.extensions['workers'] = workers
+        return workers
+
+def admin_required(view):
+    """Require 'Authorization: Bearer <ADMIN_TOKEN>'; always refused when no token is set."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        token = app.config['ADMIN_TOKEN']
+        supplied = request.headers.get('Authorization', '')
+        if not token or not hmac.compare_digest(supplied.encode(), f'Bearer {token}'.encode()):
+            return jsonify({'error': 'unauthorized'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
 def allowed_file(filename):
     """Check if file extension is allowed."""
     return '.' in filename and \
@@ -37,52 +131,71 @@ def health_check():
     }), 200
 
 @app.route('/upload', methods=['POST'])
+@admission.limit
 def upload_file():
     """Handle file upload."""
+    tracer = tracing.get_tracer()
     try:
-        # Check if file was uploaded
-        if 'file' not in request.files:
-            flash('No file selected', 'error')
-            return redirect(url_for('index'))
-        
-        file = request.files['file']
-        email = request.form.get('email', '').strip()
-        
-        # Validate inputs
-        if file.filename == '':
-            flash('No file selected', 'error')
-            return redirect(url_for('index'))
-        
-        if not email:
-            flash('Email address is required', 'error')
-            return redirect(url_for('index'))
-        
-        if not allowed_file(file.filename):
-            flash(f'File type not supported. Allowed types: {", ".join(ALLOWED_EXTENSIONS)}', 'error')
-            return redirect(url_for('index'))
-        
-        # Generate unique job ID and secure filename
+        # Job ID is generated up front so every phase is traced under it
         job_id = str(uuid.uuid4())
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        unique_filename = f"{timestamp}_{job_id[:8]}_{filename}"
-        
-        # Save file temporarily
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(file_path)
-        
-        # Get file info
-        file_size = os.path.getsize(file_path)
-        
-        flash(f'File "{filename}" uploaded successfully! Processing will begin shortly.', 'success')
-        
-        # For now, return success page with job details
-        # In future, this will trigger the processing pipeline
-        return render_template('upload_success.html', 
-                             job_id=job_id,
-                             filename=filename,
-                             file_size=file_size,
-                             email=email)
+        with tracer.span('upload', job_id=job_id, profile=True):
+            with tracer.span('upload.validate'):
+                # Check if file was uploaded
+                if 'file' not in request.files:
+                    flash('No file selected', 'error')
+                    return redirect(url_for('index'))
+                
+                file = request.files['file']
+                email = request.form.get('email', '').strip()
+                
+                # Validate inputs
+                if file.filename == '':
+                    flash('No file selected', 'error')
+                    return redirect(url_for('index'))
+                
+                if not email:
+                    flash('Email address is required', 'error')
+                    return redirect(url_for('index'))
+                
+                if not allowed_file(file.filename):
+                    flash(f'File type not supported. Allowed types: {", ".join(ALLOWED_EXTENSIONS)}', 'error')
+                    return redirect(url_for('index'))
+            
+            # Secure filename
+            filename = secure_filename(file.filename)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            unique_filename = f"{timestamp}_{job_id[:8]}_{filename}"
+            
+            # Save file temporarily
+            with tracer.span('upload.save') as span:
+                file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
+                file.save(file_path)
+                
+                # Get file info
+                file_size = os.path.getsize(file_path)
+                span.set_attribute('file.size', file_size)
+            
+            # Record the job so its status and results can be looked up
+            with tracer.span('upload.record'):
+                metadata_store.create_job(job_id, filename, email, file_size)
+            
+            # Queue for processing; small single-page documents are fast-laned.
+            # Jobs are only queued when there are workers to drain the queue.
+            if app.config['PROCESSING_WORKERS'] > 0:
+                with tracer.span('upload.enqueue'):
+                    scheduler.submit(job_id, email.lower(),
+                                     priority=classify_upload(file_path, file_size),
+                                     payload=file_path)
+                    get_workers().ensure_started()
+            
+            flash(f'File "{filename}" uploaded successfully! Processing will begin shortly.', 'success')
+            
+            with tracer.span('upload.render'):
+                return render_template('upload_success.html', 
+                                     job_id=job_id,
+                                     filename=filename,
+                                     file_size=file_size,
+                                     email=email)
     
     except Exception as e:
         app.logger.error(f"Upload error: {str(e)}")
@@ -91,13 +204,117 @@ def upload_file():
 
 @app.route('/status/<job_id>')
 def check_status(job_id):
-    """Check processing status (placeholder)."""
-    # This is a placeholder - in future this will check actual processing status
-    return jsonify({
+    """Check processing status and return any extracted results."""
+    job = metadata_store.get_job(job_id)
+    if job is None:
+        # Unknown jobs keep the original placeholder response
+        return jsonify({
+            'job_id': job_id,
+            'status': 'uploaded',
+            'message': 'File uploaded successfully. Processing will be implemented next.'
+        })
+    
+    result = {
         'job_id': job_id,
-        'status': 'uploaded',
-        'message': 'File uploaded successfully. Processing will be implemented next.'
-    })
+        'status': job['status'],
+        'filename': job['filename'],
+        'category': job['category'],
+        'created_at': job['created_at'],
+        'message': f"Job is {job['status']}."
+    }
+    
+    # Likely re-scan or re-export of an earlier document
+    if job['duplicate_of']:
+        result['duplicate_of'] = job['duplicate_of']
+        result['similarity'] = job['similarity']
+    
+    # Fields are only evaluated for categories that define them
+    from services.field_extraction import extract_fields, missing_fields
+    fields = extract_fields(job['text'], job['category'])
+    if fields:
+        result['fields'] = fields.to_dict()
+        result['missing_fields'] = missing_fields(fields, job['category'])
+    
+    return jsonify(result)
+
+@app.route('/export')
+@admin_required
+def export_results():
+    """Stream job results as CSV or JSONL, filtered by date, category and email."""
+    from services.export import EXPORT_FORMATS, SERIALISERS, gzip_chunks
+    from services.field_extraction import CATEGORY_FIELDS
+    
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported format. Use one of: {", ".join(EXPORT_FORMATS)}'}), 400
+    
+    # Dates are inclusive calendar days: ?from=2025-09-01&to=2025-09-30
+    try:
+        date_from = date.fromisoformat(request.args['from']) if 'from' in request.args else None
+        date_to = date.fromisoformat(request.args['to']) if 'to' in request.args else None
+    except ValueError:
+        return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+    
+    jobs = metadata_store.iter_jobs(
+        created_from=date_from.isoformat() if date_from else None,
+        created_before=(date_to + timedelta(days=1)).isoformat() if date_to else None,
+        category=request.args.get('category') or None,
+        email=request.args.get('email') or None,
+        text_categories=tuple(CATEGORY_FIELDS),
+    )
+    body = SERIALISERS[export_format](jobs)
+    
+    headers = {
+        'Content-Disposition': f'attachment; filename="export.{export_format}"',
+        'Vary': 'Accept-Encoding',
+    }
+    if 'gzip' in request.accept_encodings:
+        body = gzip_chunks(body)
+        headers['Content-Encoding'] = 'gzip'
+    
+    return Response(stream_with_context(body),
+                    mimetype=EXPORT_FORMATS[export_format],
+                    headers=headers)
+
+@app.route('/metrics/scheduler')
+@admin_required
+def scheduler_metrics():
+    """Processing queue depths and per-submitter wait times."""
+    return jsonify(scheduler.metrics())
+
+@app.cli.command('backfill')
+@click.argument('source', type=click.Path(exists=True))
+@click.option('--email', default='backfill@localhost', show_default=True,
+              help='Submitter recorded against backfilled jobs.')
+@click.option('--checkpoint', type=click.Path(dir_okay=False),
+              help='File recording finished documents; rerun with it to resume.')
+@click.option('--workers', type=int, default=None,
+              help='Worker processes (default: CPU count, 0: run in-process).')
+def backfill_command(source, email, checkpoint, workers):
+    """Process every document in SOURCE (a directory or manifest file)."""
+    from services.backfill import run_backfill
+    
+    def report(stats):
+        click.echo(f'{stats.processed} documents, {stats.docs_per_second:.1f} docs/sec')
+    
+    stats = run_backfill(source, email,
+                         checkpoint_path=checkpoint,
+                         workers=workers,
+                         extraction_folder=app.config['EXTRACTION_FOLDER'],
+                         progress=report)
+    
+    click.echo(f'Processed {stats.processed} documents ({stats.failed} failed, '
+               f'{stats.duplicates} likely duplicates, '
+               f'{stats.skipped} already done) in {stats.elapsed:.1f}s '
+               f'({stats.docs_per_second:.1f} docs/sec)')
+
+@app.cli.command('compile-templates')
+@click.argument('target', type=click.Path(file_okay=False))
+def compile_templates_command(target):
+    """Compile the Jinja templates into Python modules in TARGET."""
+    os.makedirs(target, exist_ok=True)
+    app.jinja_env.compile_templates(target, zip=None, ignore_errors=False)
+    click.echo(f'Compiled templates into {target}')
 
 @app.errorhandler(413)
 def too_large(e):
@@ -105,6 +322,19 @@ def too_large(e):
     flash('File too large. Maximum size is 16MB.', 'error')
     return redirect(url_for('index'))
 
+@app.errorhandler(429)
+def too_many_requests(e):
+    """Handle uploads rejected by admission control."""
+    if request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json':
+        response = jsonify({'error': 'too_many_requests', 'message': e.description})
+        response.status_code = 429
+    else:
+        flash(e.description, 'error')
+        response = app.make_response((render_template('index.html'), 429))
+    if e.retry_after is not None:
+        response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
 @app.errorhandler(404)
 def not_found(e):
     """Handle 404 errors."""
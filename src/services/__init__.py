@@ -0,0 +1 @@
+"""Service modules used by the document processing pipeline."""
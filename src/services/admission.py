@@ -0,0 +1,175 @@
+"""
+Admission control for upload requests.
+
+Three checks run before an upload is accepted, each O(1):
+
+* a per-client token bucket limits the sustained upload rate;
+* per-client and global concurrency caps bound simultaneous uploads;
+* uploads are shed while the processing backlog is above a threshold.
+
+Rejected requests raise ``TooManyRequests`` carrying a ``Retry-After``
+value, so overload produces fast 429 responses instead of timeouts.
+
+Token buckets live in process memory by default. ``RedisRateLimiter`` keeps
+them in Redis so that limits are shared between workers and instances;
+concurrency caps are always per process.
+"""
+import functools
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import request
+from werkzeug.exceptions import TooManyRequests
+
+
+class InMemoryRateLimiter:
+    """Token buckets keyed by client, held in an LRU table under one short lock.
+
+    At most ``max_clients`` buckets are kept; when the table is full the
+    least recently used bucket is dropped.
+    """
+
+    def __init__(self, rate, burst, max_clients=10000, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._clock = clock
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key):
+        """Take one token for ``key``; return seconds to wait, 0 if allowed."""
+        now = self._clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_clients:
+                    self._buckets.popitem(last=False)
+                bucket = self._buckets[key] = [float(self.burst), now]
+            else:
+                self._buckets.move_to_end(key)
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens >= 1:
+                bucket[0] = tokens - 1
+                return 0.0
+            bucket[0] = tokens
+            return (1 - tokens) / self.rate
+
+    def reset(self):
+        """Forget all client buckets."""
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisRateLimiter:
+    """Token buckets stored in Redis, shared across processes.
+
+    Requires the optional ``redis`` package.
+    """
+
+    SCRIPT = """
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'last')
+    local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+    local tokens = tonumber(bucket[1]) or burst
+    local last = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - last) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'last', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url, rate, burst, prefix='upload-rate:'):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError('RedisRateLimiter requires the redis package') from e
+        self.rate = rate
+        self.burst = burst
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    def take(self, key):
+        """Take one token for ``key``; return seconds to wait, 0 if allowed."""
+        wait = self._script(keys=[self.prefix + key], args=[self.rate, self.burst, time.time()])
+        return float(wait)
+
+    def reset(self):
+        """Forget all client buckets."""
+        for key in self._client.scan_iter(self.prefix + '*'):
+            self._client.delete(key)
+
+
+class AdmissionController:
+    """Decides whether an upload may proceed, and tracks those in progress."""
+
+    def __init__(self, rate_limiter, max_concurrent_per_client, max_concurrent_total,
+                 max_backlog=None, backlog=None, backlog_retry_after=30):
+        self.rate_limiter = rate_limiter
+        self.max_concurrent_per_client = max_concurrent_per_client
+        self.max_concurrent_total = max_concurrent_total
+        self.max_backlog = max_backlog
+        self.backlog = backlog
+        self.backlog_retry_after = backlog_retry_after
+        self._active = {}
+        self._active_total = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, client):
+        """Admit a request from ``client`` or raise ``TooManyRequests``."""
+        if self.max_backlog is not None and self.backlog is not None \
+                and self.backlog() >= self.max_backlog:
+            raise TooManyRequests('Processing backlog is full. Please try again later.',
+                                  retry_after=self.backlog_retry_after)
+
+        wait = self.rate_limiter.take(client)
+        if wait > 0:
+            raise TooManyRequests('Too many uploads. Please slow down.',
+                                  retry_after=max(1, math.ceil(wait)))
+
+        with self._lock:
+            active = self._active.get(client, 0)
+            if active >= self.max_concurrent_per_client:
+                reason = 'Too many uploads in progress from this client.'
+            elif self._active_total >= self.max_concurrent_total:
+                reason = 'Server is busy. Please try again shortly.'
+            else:
+                self._active[client] = active + 1
+                self._active_total += 1
+                return
+        raise TooManyRequests(reason, retry_after=1)
+
+    def release(self, client):
+        """Mark an admitted request from ``client`` as finished."""
+        with self._lock:
+            active = self._active.get(client, 0) - 1
+            if active > 0:
+                self._active[client] = active
+            else:
+                self._active.pop(client, None)
+            self._active_total -= 1
+
+    def reset(self):
+        """Clear rate limiter state; in-progress counts are left untouched."""
+        self.rate_limiter.reset()
+
+    def limit(self, view):
+        """Decorate a view so every request must be admitted first."""
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            client = request.remote_addr or 'unknown'
+            self.acquire(client)
+            try:
+                return view(*args, **kwargs)
+            finally:
+                self.release(client)
+        return wrapper
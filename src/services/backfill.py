@@ -0,0 +1,123 @@
+"""
+Offline batch processing of existing document folders.
+
+Documents are read from a directory tree or a manifest file (one path per
+line), run through the pipeline's scan/extract/categorise stages in a
+process pool, and stored in the parent process. Each finished path is
+appended to a checkpoint file after its result is committed, so an
+interrupted run can be restarted and will skip work already done. Documents
+are checked for near-duplicates against everything already in the store,
+through the app's long-lived duplicate index.
+"""
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from services.pipeline import FILE_SIGNATURES, process_document, store_result
+
+
+def iter_documents(source):
+    """Yield absolute document paths from a directory (recursively) or a manifest file."""
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if '.' in name and name.rsplit('.', 1)[1].lower() in FILE_SIGNATURES:
+                    yield os.path.abspath(os.path.join(root, name))
+    else:
+        base = os.path.dirname(os.path.abspath(source))
+        with open(source) as manifest:
+            for line in manifest:
+                path = line.strip()
+                if path and not path.startswith('#'):
+                    yield os.path.abspath(os.path.join(base, path))
+
+
+def load_checkpoint(path):
+    """Return the set of absolute paths already recorded in a checkpoint file."""
+    if not path or not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {os.path.abspath(line.rstrip('\n')) for line in f if line.strip()}
+
+
+def _bounded_map(executor, fn, items, window):
+    # Executor.map() submits every item up front; keep at most ``window``
+    # futures outstanding so huge archives do not fill memory.
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class BackfillStats:
+    """Running totals for a backfill run."""
+
+    def __init__(self):
+        self.processed = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.skipped = 0
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def docs_per_second(self):
+        return self.processed / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def run_backfill(source, email, checkpoint_path=None, workers=None,
+                 extraction_folder=None, progress=None, progress_every=100):
+    """Process every document under ``source``; return a BackfillStats.
+
+    ``workers`` defaults to the CPU count; ``workers=0`` runs the stages in
+    the current process. ``progress`` is called with the stats every
+    ``progress_every`` documents.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    done = load_checkpoint(checkpoint_path)
+    stats = BackfillStats()
+
+    def pending():
+        for path in iter_documents(source):
+            if path in done:
+                stats.skipped += 1
+            else:
+                yield path
+
+    documents = pending()
+
+    checkpoint = open(checkpoint_path, 'a') if checkpoint_path else None
+    executor = ProcessPoolExecutor(workers) if workers > 0 else None
+    try:
+        if executor is None:
+            results = map(process_document, documents)
+        else:
+            results = _bounded_map(executor, process_document, documents,
+                                   window=4 * workers)
+        for result in results:
+            store_result(result, email, extraction_folder=extraction_folder)
+            stats.processed += 1
+            if result['error'] is not None:
+                stats.failed += 1
+            elif result['duplicate_of'] is not None:
+                stats.duplicates += 1
+            if checkpoint is not None:
+                checkpoint.write(os.path.abspath(result['path']) + '\n')
+                checkpoint.flush()
+            if progress is not None and stats.processed % progress_every == 0:
+                progress(stats)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if checkpoint is not None:
+            checkpoint.close()
+    return stats
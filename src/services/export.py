@@ -0,0 +1,92 @@
+"""
+Streaming serialisation of job results for bulk export.
+
+Every function here consumes and produces iterators, so an export of any
+size is written out row by row without being held in memory.
+"""
+import csv
+import io
+import json
+import zlib
+
+from services.field_extraction import extract_fields
+
+EXPORT_COLUMNS = ('job_id', 'filename', 'email', 'file_size', 'status', 'category',
+                  'duplicate_of', 'similarity', 'created_at', 'updated_at', 'fields')
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+# Spreadsheets treat cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _with_fields(job):
+    record = {column: job.get(column) for column in EXPORT_COLUMNS[:-1]}
+    fields = extract_fields(job.get('text'), job.get('category'))
+    record['fields'] = fields.to_dict() if fields else None
+    return record
+
+
+def _csv_cell(value):
+    # Text is user supplied (filenames, emails); quote it so a spreadsheet
+    # shows it instead of evaluating it
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_lines(jobs):
+    """Yield a CSV header and one line per job; fields are JSON-encoded.
+
+    Text cells that a spreadsheet would read as a formula are prefixed
+    with a single quote.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values):
+        writer.writerow([_csv_cell(value) for value in values])
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    yield line(EXPORT_COLUMNS)
+    for job in jobs:
+        record = _with_fields(job)
+        if record['fields'] is not None:
+            record['fields'] = json.dumps(record['fields'], separators=(',', ':'))
+        yield line(record[column] for column in EXPORT_COLUMNS)
+
+
+def jsonl_lines(jobs):
+    """Yield one JSON object per line per job."""
+    for job in jobs:
+        yield json.dumps(_with_fields(job), separators=(',', ':')) + '\n'
+
+
+SERIALISERS = {
+    'csv': csv_lines,
+    'jsonl': jsonl_lines,
+}
+
+
+def gzip_chunks(lines, min_chunk_size=64 * 1024):
+    """Gzip-compress an iterator of text lines on the fly.
+
+    Output is flushed whenever at least ``min_chunk_size`` bytes of input
+    have been compressed, keeping the compressor's buffer bounded.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    pending = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        pending += len(data)
+        chunk = compressor.compress(data)
+        if pending >= min_chunk_size:
+            chunk += compressor.flush(zlib.Z_SYNC_FLUSH)
+            pending = 0
+        if chunk:
+            yield chunk
+    yield compressor.flush()
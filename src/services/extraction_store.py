@@ -0,0 +1,287 @@
+"""
+Compact columnar storage for Textract-shaped extraction results.
+
+A Textract response is a list of blocks, each carrying its own nested
+``Geometry.BoundingBox`` dict, ``Confidence``, ``Id`` and ``Text``; stored as
+JSON, that is several hundred bytes per word. Here the same blocks are stored
+column by column: bounding boxes and confidences as float32 arrays, and all
+strings (text and block ids) interned into a single table referenced by
+uint32 index.
+
+File layout (little-endian)::
+
+    MAGIC (8 bytes) | header length (uint32) | JSON header | padding
+    | column 0 | padding | column 1 | ...
+
+Every column starts on an 8-byte boundary so that it can be memory-mapped
+and viewed directly as a typed array without copying.
+"""
+import array
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+
+MAGIC = b'DCOL\x01\x00\x00\x00'
+FORMAT_VERSION = 1
+NO_STRING = 0xFFFFFFFF
+_ALIGNMENT = 8
+
+# (name, array typecode) in on-disk order
+COLUMNS = (
+    ('block_type', 'B'),
+    ('page', 'H'),
+    ('text', 'I'),
+    ('id', 'I'),
+    ('confidence', 'f'),
+    ('left', 'f'),
+    ('top', 'f'),
+    ('width', 'f'),
+    ('height', 'f'),
+)
+_BOX_COLUMNS = ('width', 'height', 'left', 'top')
+
+
+class ExtractionFormatError(ValueError):
+    """Raised when a file is not a valid columnar extraction file."""
+
+
+def _padding(offset):
+    return -offset % _ALIGNMENT
+
+
+class ColumnarExtraction:
+    """Textract blocks stored as parallel typed columns.
+
+    Columns are exposed as attributes (``extraction.left[i]`` etc.). They are
+    ``array.array`` objects when built in memory or read eagerly, and typed
+    ``memoryview`` objects over the file when loaded with ``use_mmap=True``.
+    Block relationships and polygons are not stored; highlight rendering only
+    needs the axis-aligned bounding box.
+    """
+
+    def __init__(self, strings, block_types, columns, pages=None, _mmap=None):
+        self.strings = strings
+        self.block_types = block_types
+        self.pages = pages
+        self._mmap = _mmap
+        for name, _ in COLUMNS:
+            setattr(self, name, columns[name])
+
+    @classmethod
+    def from_textract(cls, response):
+        """Convert a Textract response dict (or its ``Blocks`` list)."""
+        blocks = response.get('Blocks', []) if isinstance(response, dict) else response
+        columns = {name: array.array(typecode) for name, typecode in COLUMNS}
+        strings = []
+        string_index = {}
+        block_types = []
+        block_type_index = {}
+
+        def intern(value):
+            if value is None:
+                return NO_STRING
+            index = string_index.get(value)
+            if index is None:
+                index = string_index[value] = len(strings)
+                strings.append(value)
+            return index
+
+        page = 0
+        for block in blocks:
+            block_type = block.get('BlockType', '')
+            code = block_type_index.get(block_type)
+            if code is None:
+                if len(block_types) == 256:
+                    raise ExtractionFormatError('Too many distinct block types')
+                code = block_type_index[block_type] = len(block_types)
+                block_types.append(block_type)
+            if block_type == 'PAGE':
+                page += 1
+            box = block.get('Geometry', {}).get('BoundingBox', {})
+
+            columns['block_type'].append(code)
+            columns['page'].append(block.get('Page', max(page, 1)))
+            columns['text'].append(intern(block.get('Text')))
+            columns['id'].append(intern(block.get('Id')))
+            columns['confidence'].append(block.get('Confidence', math.nan))
+            columns['left'].append(box.get('Left', 0.0))
+            columns['top'].append(box.get('Top', 0.0))
+            columns['width'].append(box.get('Width', 0.0))
+            columns['height'].append(box.get('Height', 0.0))
+
+        pages = None
+        if isinstance(response, dict):
+            pages = response.get('DocumentMetadata', {}).get('Pages')
+        return cls(strings, block_types, columns, pages=pages or page or None)
+
+    def __len__(self):
+        return len(self.block_type)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Release the memory map, if the extraction was loaded with one."""
+        if self._mmap is None:
+            return
+        for name, _ in COLUMNS:
+            view = getattr(self, name)
+            if isinstance(view, memoryview):
+                view.release()
+        self._mmap.close()
+        self._mmap = None
+
+    def string(self, index):
+        """Resolve an interned string index, returning None for NO_STRING."""
+        return None if index == NO_STRING else self.strings[index]
+
+    def indices(self, block_type, page=None):
+        """Yield row indices of the given block type, optionally on one page."""
+        try:
+            code = self.block_types.index(block_type)
+        except ValueError:
+            return
+        types = self.block_type
+        pages = self.page
+        for i in range(len(types)):
+            if types[i] == code and (page is None or pages[i] == page):
+                yield i
+
+    def word_boxes(self, page=None):
+        """Yield ``(text, left, top, width, height, confidence)`` per word."""
+        for i in self.indices('WORD', page):
+            yield (self.string(self.text[i]), self.left[i], self.top[i],
+                   self.width[i], self.height[i], self.confidence[i])
+
+    def plain_text(self):
+        """Return the plain text: LINE blocks if present, otherwise WORDs."""
+        lines = [self.string(self.text[i]) for i in self.indices('LINE')]
+        if lines:
+            return '\n'.join(lines)
+        return ' '.join(self.string(self.text[i]) for i in self.indices('WORD'))
+
+    def to_blocks(self):
+        """Convert back to a list of Textract-shaped block dicts.
+
+        Box and confidence values come back at float32 precision.
+        """
+        blocks = []
+        for i in range(len(self)):
+            block = {
+                'BlockType': self.block_types[self.block_type[i]],
+                'Geometry': {
+                    'BoundingBox': {
+                        name.capitalize(): getattr(self, name)[i]
+                        for name in _BOX_COLUMNS
+                    }
+                },
+                'Page': self.page[i],
+            }
+            text = self.string(self.text[i])
+            if text is not None:
+                block['Text'] = text
+            block_id = self.string(self.id[i])
+            if block_id is not None:
+                block['Id'] = block_id
+            if not math.isnan(self.confidence[i]):
+                block['Confidence'] = self.confidence[i]
+            blocks.append(block)
+        return blocks
+
+    def save(self, path):
+        """Write the extraction to ``path`` in the columnar file format."""
+        payloads = []
+        for name, typecode in COLUMNS:
+            column = array.array(typecode, getattr(self, name))
+            if sys.byteorder != 'little':
+                column.byteswap()
+            payloads.append((name, typecode, column.tobytes()))
+
+        header = {
+            'version': FORMAT_VERSION,
+            'count': len(self),
+            'pages': self.pages,
+            'block_types': self.block_types,
+            'strings': self.strings,
+            'columns': [],
+        }
+        # Offsets depend on the header length, which depends on the offsets;
+        # offsets are therefore recorded relative to the end of the header.
+        offset = 0
+        for name, typecode, payload in payloads:
+            header['columns'].append({'name': name, 'type': typecode, 'offset': offset})
+            offset += len(payload) + _padding(len(payload))
+
+        header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+        prefix_len = len(MAGIC) + 4 + len(header_bytes)
+        with open(path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<I', len(header_bytes)))
+            f.write(header_bytes)
+            f.write(b'\x00' * _padding(prefix_len))
+            for _, _, payload in payloads:
+                f.write(payload)
+                f.write(b'\x00' * _padding(len(payload)))
+
+    @classmethod
+    def load(cls, path, use_mmap=True):
+        """Read an extraction file, memory-mapping the columns by default."""
+        header_start = len(MAGIC) + 4
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < header_start:
+                raise ExtractionFormatError(f'{path} is not a columnar extraction file')
+            if use_mmap and sys.byteorder == 'little':
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                buffer = f.read()
+                use_mmap = False
+
+        view = memoryview(buffer)
+        columns = {}
+        try:
+            if bytes(view[:len(MAGIC)]) != MAGIC:
+                raise ExtractionFormatError(f'{path} is not a columnar extraction file')
+            (header_len,) = struct.unpack_from('<I', view, len(MAGIC))
+            if header_start + header_len > len(view):
+                raise ExtractionFormatError(f'{path} is truncated')
+            try:
+                header = json.loads(bytes(view[header_start:header_start + header_len]))
+            except ValueError as e:
+                raise ExtractionFormatError(f'{path} has a corrupt header') from e
+            data_start = header_start + header_len
+            data_start += _padding(data_start)
+
+            count = header['count']
+            for column in header['columns']:
+                typecode = column['type']
+                start = data_start + column['offset']
+                end = start + count * array.array(typecode).itemsize
+                if end > len(view):
+                    raise ExtractionFormatError(f'{path} is truncated')
+                if use_mmap:
+                    columns[column['name']] = view[start:end].cast(typecode)
+                else:
+                    values = array.array(typecode)
+                    values.frombytes(view[start:end])
+                    if sys.byteorder != 'little':
+                        values.byteswap()
+                    columns[column['name']] = values
+        except Exception:
+            # Column views export the buffer; it cannot be closed while they live
+            if use_mmap:
+                for column in columns.values():
+                    column.release()
+            view.release()
+            if use_mmap:
+                buffer.close()
+            raise
+        view.release()
+
+        return cls(header['strings'], header['block_types'], columns,
+                   pages=header.get('pages'), _mmap=buffer if use_mmap else None)
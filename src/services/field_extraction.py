@@ -0,0 +1,155 @@
+"""
+Local key-value and table extraction from document text.
+
+Fields are pulled out with regular expressions compiled once at import time.
+Only the fields listed for a document's category are ever evaluated, and
+each one is computed lazily the first time it is read, so documents whose
+category needs no fields cost nothing. When the required fields for a
+category are all found locally there is no need for a Textract
+AnalyzeDocument call.
+"""
+import re
+from collections.abc import Mapping
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+# Fields evaluated per category, in output order
+CATEGORY_FIELDS = {
+    'invoice': ('invoice_number', 'total', 'dates', 'line_items'),
+    'receipt': ('total', 'dates'),
+}
+
+# Fields that must be found locally before AnalyzeDocument can be skipped
+REQUIRED_FIELDS = {
+    'invoice': ('invoice_number', 'total'),
+    'receipt': ('total',),
+}
+
+_AMOUNT = r'[£$€]?\s?(\d{1,3}(?:,\d{3})*(?:\.\d{2})|\d+\.\d{2})'
+
+INVOICE_NUMBER_PATTERN = re.compile(
+    r'\binvoice[ \t]*(?:no\.?|number|num|#)?[ \t]*[:#]?[ \t]*([A-Z0-9][A-Z0-9\-/]*\d[A-Z0-9\-/]*)',
+    re.IGNORECASE,
+)
+TOTAL_PATTERN = re.compile(
+    r'^[ \t]*(?:grand[ \t]+)?(?:total|amount[ \t]+due|balance[ \t]+due)'
+    r'(?:[ \t]+(?:due|amount|payable))?[ \t]*[:\-]?[ \t]*' + _AMOUNT,
+    re.IGNORECASE | re.MULTILINE,
+)
+DATE_PATTERN = re.compile(
+    r'\b(\d{4}-\d{2}-\d{2}'
+    r'|\d{1,2}/\d{1,2}/\d{4}'
+    r'|(?:January|February|March|April|May|June|July|August|September|October|November|December)'
+    r' \d{1,2}, \d{4}'
+    r'|\d{1,2} (?:January|February|March|April|May|June|July|August|September|October|November|December)'
+    r' \d{4})\b'
+)
+LINE_ITEM_PATTERN = re.compile(
+    r'^[ \t]*(?P<description>[A-Za-z][^\n]*?)[ \t]+(?P<quantity>\d+(?:\.\d+)?)'
+    r'[ \t]+' + _AMOUNT.replace('(', '(?P<unit_price>', 1)
+    + r'[ \t]+' + _AMOUNT.replace('(', '(?P<amount>', 1) + r'[ \t]*$',
+    re.MULTILINE,
+)
+
+_DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%B %d, %Y', '%d %B %Y')
+
+
+def _normalise_amount(value):
+    try:
+        return str(Decimal(value.replace(',', '')))
+    except InvalidOperation:
+        return None
+
+
+def _normalise_date(value):
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def extract_invoice_number(text):
+    """Return the first invoice number in the text, or None."""
+    match = INVOICE_NUMBER_PATTERN.search(text)
+    return match.group(1) if match else None
+
+
+def extract_total(text):
+    """Return the last total/amount due as a decimal string, or None.
+
+    The last match is used because totals follow subtotals on invoices.
+    """
+    matches = TOTAL_PATTERN.findall(text)
+    return _normalise_amount(matches[-1]) if matches else None
+
+
+def extract_dates(text):
+    """Return all dates in the text as ISO strings, in document order."""
+    dates = []
+    for match in DATE_PATTERN.finditer(text):
+        date = _normalise_date(match.group(1))
+        if date and date not in dates:
+            dates.append(date)
+    return dates
+
+
+def extract_line_items(text):
+    """Return table rows of description, quantity, unit price and amount."""
+    return [
+        {
+            'description': match.group('description').strip(),
+            'quantity': match.group('quantity'),
+            'unit_price': _normalise_amount(match.group('unit_price')),
+            'amount': _normalise_amount(match.group('amount')),
+        }
+        for match in LINE_ITEM_PATTERN.finditer(text)
+    ]
+
+
+EXTRACTORS = {
+    'invoice_number': extract_invoice_number,
+    'total': extract_total,
+    'dates': extract_dates,
+    'line_items': extract_line_items,
+}
+
+
+class DocumentFields(Mapping):
+    """Read-only mapping of field name to value, evaluated on first access."""
+
+    def __init__(self, text, field_names):
+        self._text = text
+        self._field_names = tuple(field_names)
+        self._values = {}
+
+    def __getitem__(self, name):
+        if name not in self._field_names:
+            raise KeyError(name)
+        if name not in self._values:
+            self._values[name] = EXTRACTORS[name](self._text)
+        return self._values[name]
+
+    def __iter__(self):
+        return iter(self._field_names)
+
+    def __len__(self):
+        return len(self._field_names)
+
+    def to_dict(self):
+        """Evaluate every field and return a plain dict."""
+        return {name: self[name] for name in self._field_names}
+
+
+def extract_fields(text, category):
+    """Return lazily evaluated fields for a document of the given category."""
+    return DocumentFields(text or '', CATEGORY_FIELDS.get(category, ()))
+
+
+def missing_fields(fields, category):
+    """Return required fields that local rules could not find.
+
+    An empty result means AnalyzeDocument does not need to be called.
+    """
+    return [name for name in REQUIRED_FIELDS.get(category, ()) if not fields.get(name)]
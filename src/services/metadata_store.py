@@ -0,0 +1,223 @@
+"""
+SQLite-backed store for job metadata and processing results.
+
+One connection is opened per application context and closed on teardown,
+following the usual Flask pattern. The schema is created on first connect.
+"""
+import sqlite3
+from datetime import datetime
+
+from flask import current_app, g
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    email TEXT NOT NULL,
+    file_size INTEGER,
+    status TEXT NOT NULL,
+    category TEXT,
+    text TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at, job_id);
+"""
+
+# Columns added after the original schema, applied to existing databases
+ADDED_COLUMNS = {
+    'signature': 'BLOB',
+    'duplicate_of': 'TEXT',
+    'similarity': 'REAL',
+}
+
+# Append-only log of stored signatures. Ids are assigned inside the write
+# transaction, and SQLite runs one write at a time, so readers that remember
+# the last id they saw never miss a row committed after it.
+SIGNATURES_TABLE = """
+CREATE TABLE IF NOT EXISTS signatures (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id TEXT NOT NULL,
+    category TEXT,
+    signature BLOB NOT NULL
+)
+"""
+
+# Result columns callers may set through create_job() and update_job()
+RESULT_COLUMNS = {'category', 'text', 'signature', 'duplicate_of', 'similarity'}
+UPDATABLE_COLUMNS = RESULT_COLUMNS | {'status'}
+
+# Columns returned by iter_jobs(); extracted text is only loaded on request
+LISTING_COLUMNS = ('job_id', 'filename', 'email', 'file_size', 'status',
+                   'category', 'duplicate_of', 'similarity', 'created_at', 'updated_at')
+
+
+def get_db():
+    """Return the connection for the current application context."""
+    if 'db' not in g:
+        g.db = sqlite3.connect(current_app.config['DATABASE'])
+        g.db.row_factory = sqlite3.Row
+        g.db.executescript(SCHEMA)
+        _add_missing_columns(g.db)
+        _create_signatures_table(g.db)
+    return g.db
+
+
+def _add_missing_columns(db):
+    existing = {row['name'] for row in db.execute('PRAGMA table_info(jobs)')}
+    for column, column_type in ADDED_COLUMNS.items():
+        if column not in existing:
+            db.execute(f'ALTER TABLE jobs ADD COLUMN {column} {column_type}')
+    db.commit()
+
+
+def _create_signatures_table(db):
+    exists = db.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'signatures'"
+    ).fetchone()
+    if exists:
+        return
+    db.execute(SIGNATURES_TABLE)
+    # Signatures stored before the table existed are copied over once
+    db.execute(
+        'INSERT INTO signatures (job_id, category, signature)'
+        ' SELECT job_id, category, signature FROM jobs'
+        ' WHERE signature IS NOT NULL AND NOT EXISTS (SELECT 1 FROM signatures)'
+        ' ORDER BY updated_at, job_id'
+    )
+    db.commit()
+
+
+def _append_signature(db, job_id, values):
+    # Runs in the same transaction as the job write
+    if values.get('signature') is not None:
+        db.execute(
+            'INSERT INTO signatures (job_id, category, signature) VALUES (?, ?, ?)',
+            (job_id, values.get('category'), values['signature']),
+        )
+
+
+def close_db(e=None):
+    """Close the connection opened for this application context, if any."""
+    db = g.pop('db', None)
+    if db is not None:
+        db.close()
+
+
+def init_app(app):
+    """Register connection teardown with the Flask app."""
+    app.teardown_appcontext(close_db)
+
+
+def create_job(job_id, filename, email, file_size, status='uploaded', **results):
+    """Record a new job, optionally with its results already known."""
+    unknown = set(results) - RESULT_COLUMNS
+    if unknown:
+        raise ValueError(f'Unknown result columns: {", ".join(sorted(unknown))}')
+    now = datetime.utcnow().isoformat()
+    values = {'job_id': job_id, 'filename': filename, 'email': email,
+              'file_size': file_size, 'status': status, **results,
+              'created_at': now, 'updated_at': now}
+    db = get_db()
+    db.execute(
+        f'INSERT INTO jobs ({", ".join(values)}) VALUES ({", ".join("?" for _ in values)})',
+        tuple(values.values()),
+    )
+    _append_signature(db, job_id, values)
+    db.commit()
+
+
+def update_job(job_id, **fields):
+    """Update status/results columns of an existing job."""
+    unknown = set(fields) - UPDATABLE_COLUMNS
+    if unknown:
+        raise ValueError(f'Cannot update columns: {", ".join(sorted(unknown))}')
+    if not fields:
+        return
+    fields['updated_at'] = datetime.utcnow().isoformat()
+    assignments = ', '.join(f'{column} = ?' for column in fields)
+    db = get_db()
+    db.execute(
+        f'UPDATE jobs SET {assignments} WHERE job_id = ?',
+        (*fields.values(), job_id),
+    )
+    _append_signature(db, job_id, fields)
+    db.commit()
+
+
+def get_job(job_id):
+    """Return a job as a dict, or None if it does not exist."""
+    row = get_db().execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+    return dict(row) if row is not None else None
+
+
+def iter_jobs(created_from=None, created_before=None, category=None, email=None,
+              text_categories=(), page_size=500):
+    """Yield jobs matching the filters, oldest first.
+
+    Rows are fetched a page at a time using keyset pagination on
+    ``(created_at, job_id)``, so memory use does not depend on the number of
+    matching jobs. Extracted text is included only for jobs whose category is
+    in ``text_categories``.
+    """
+    conditions = []
+    params = []
+    if created_from is not None:
+        conditions.append('created_at >= ?')
+        params.append(created_from)
+    if created_before is not None:
+        conditions.append('created_at < ?')
+        params.append(created_before)
+    if category is not None:
+        conditions.append('category = ?')
+        params.append(category)
+    if email is not None:
+        conditions.append('email = ? COLLATE NOCASE')
+        params.append(email)
+
+    columns = ', '.join(LISTING_COLUMNS)
+    if text_categories:
+        placeholders = ', '.join('?' for _ in text_categories)
+        columns += f', CASE WHEN category IN ({placeholders}) THEN text END AS text'
+    column_params = list(text_categories)
+
+    db = get_db()
+    last = None
+    while True:
+        page_conditions = list(conditions)
+        page_params = column_params + params
+        if last is not None:
+            page_conditions.append('(created_at > ? OR (created_at = ? AND job_id > ?))')
+            page_params += [last[0], last[0], last[1]]
+        where = f' WHERE {" AND ".join(page_conditions)}' if page_conditions else ''
+        rows = db.execute(
+            f'SELECT {columns} FROM jobs{where} ORDER BY created_at, job_id LIMIT ?',
+            (*page_params, page_size),
+        ).fetchall()
+        for row in rows:
+            yield dict(row)
+        if len(rows) < page_size:
+            return
+        last = (rows[-1]['created_at'], rows[-1]['job_id'])
+
+
+def iter_signatures(after_id=0, page_size=1000):
+    """Yield ``(id, job_id, category, signature bytes)`` for stored signatures.
+
+    Rows come from the append-only signatures table in id order, starting
+    after ``after_id``, so a caller can pick up only signatures stored since
+    its last call. A job stored more than once appears once per store.
+    """
+    db = get_db()
+    last = after_id
+    while True:
+        rows = db.execute(
+            'SELECT id, job_id, category, signature FROM signatures'
+            ' WHERE id > ? ORDER BY id LIMIT ?',
+            (last, page_size),
+        ).fetchall()
+        for row in rows:
+            yield row['id'], row['job_id'], row['category'], row['signature']
+        if len(rows) < page_size:
+            return
+        last = rows[-1]['id']
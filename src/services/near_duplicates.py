@@ -0,0 +1,140 @@
+"""
+Near-duplicate detection with MinHash signatures and an LSH index.
+
+The same invoice rescanned or re-exported produces slightly different text,
+so exact hashes miss it. Instead, the text is split into overlapping word
+shingles and summarised as a MinHash signature: the fraction of equal
+positions in two signatures estimates the Jaccard similarity of their
+shingle sets.
+
+The LSH index splits each signature into bands and files the document under
+one bucket per band. Documents that agree on any whole band become
+candidates, and only those are compared signature-to-signature, so a lookup
+costs a fixed number of dict probes regardless of how many documents are
+indexed.
+
+Signing costs one modular hash per shingle per permutation in pure Python,
+about 45 microseconds per shingle with 128 permutations. It runs in the
+processing threads of the web process, so long documents are capped at
+``MAX_SHINGLES``: only the shingles with the smallest hashes are kept. The
+choice depends only on the shingle hashes, so near-identical documents keep
+nearly the same sample and their similarity is still estimated well. This
+bounds signing to roughly 25 ms per document.
+"""
+import array
+import heapq
+import random
+import re
+import zlib
+
+NUM_PERM = 128
+BANDS = 32
+SHINGLE_SIZE = 3
+MAX_SHINGLES = 512
+DUPLICATE_THRESHOLD = 0.8
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = 0xFFFFFFFF
+_WORD = re.compile(r'\w+')
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Return the set of hashed ``size``-word shingles of normalised text."""
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))} if words else set()
+    return {
+        zlib.crc32(' '.join(words[i:i + size]).encode('utf-8'))
+        for i in range(len(words) - size + 1)
+    }
+
+
+class MinHasher:
+    """Computes MinHash signatures with ``num_perm`` universal hash functions."""
+
+    def __init__(self, num_perm=NUM_PERM, seed=1, max_shingles=MAX_SHINGLES):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.max_shingles = max_shingles
+        self._params = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, text):
+        """Return the signature of ``text`` as an ``array('I')``, or None if empty."""
+        hashes = shingles(text)
+        if not hashes:
+            return None
+        if len(hashes) > self.max_shingles:
+            hashes = heapq.nsmallest(self.max_shingles, hashes)
+        return array.array('I', (
+            min([(a * h + b) % _MERSENNE_PRIME for h in hashes]) & _MAX_HASH
+            for a, b in self._params
+        ))
+
+
+def similarity(first, second):
+    """Estimate Jaccard similarity from two signatures."""
+    return sum(x == y for x, y in zip(first, second)) / len(first)
+
+
+def signature_from_bytes(data):
+    """Rebuild a signature stored with ``array.tobytes()``."""
+    signature = array.array('I')
+    signature.frombytes(data)
+    return signature
+
+
+class LSHIndex:
+    """Banded locality-sensitive hash index over MinHash signatures."""
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS):
+        if num_perm % bands:
+            raise ValueError('num_perm must be a multiple of bands')
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets = [{} for _ in range(bands)]
+        self._signatures = {}
+        self._categories = {}
+
+    def __len__(self):
+        return len(self._signatures)
+
+    def _band_keys(self, signature):
+        rows = self.rows
+        for band in range(self.bands):
+            yield band, signature[band * rows:(band + 1) * rows].tobytes()
+
+    def add(self, key, signature, category=None):
+        """Index a document's signature under ``key``.
+
+        A key is only indexed once; adding it again just updates its category.
+        """
+        self._categories[key] = category
+        if key in self._signatures:
+            return
+        self._signatures[key] = signature
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band].setdefault(band_key, []).append(key)
+
+    def candidates(self, signature):
+        """Return keys sharing at least one band with ``signature``."""
+        found = set()
+        for band, band_key in self._band_keys(signature):
+            found.update(self._buckets[band].get(band_key, ()))
+        return found
+
+    def query(self, signature, threshold=DUPLICATE_THRESHOLD):
+        """Return ``(key, category, similarity)`` of the closest match, or None.
+
+        Only matches with estimated similarity of at least ``threshold``
+        are returned.
+        """
+        best = None
+        for key in self.candidates(signature):
+            score = similarity(signature, self._signatures[key])
+            if score >= threshold and (best is None or score > best[2]):
+                best = (key, self._categories[key], score)
+        return best
+
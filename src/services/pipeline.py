@@ -0,0 +1,261 @@
+"""
+Document processing pipeline stages.
+
+A document goes through four stages:
+
+1. ``scan_document``    - reject files whose content does not match a
+                          supported document type;
+2. ``extract_document`` - get text (and word geometry, when a Textract result
+                          is available) out of the file, plus a MinHash
+                          signature of the text;
+3. ``categorise_text``  - assign a category from keyword rules;
+4. ``store_result``     - flag near-duplicates of earlier documents, reusing
+                          their category, and record the job and its results
+                          in the metadata store. Duplicates are looked up in
+                          one long-lived index per app, kept in step with the
+                          store.
+
+Stages 1-3 are pure functions of the file and can run in worker processes;
+``process_document`` chains them. Stage 4 needs the Flask app context.
+Each stage runs in a tracing span under the document's job id.
+"""
+import json
+import os
+import re
+import threading
+import uuid
+import zlib
+
+from flask import current_app
+
+from services import metadata_store
+from services.extraction_store import ColumnarExtraction
+from services.near_duplicates import LSHIndex, MinHasher, signature_from_bytes
+from services.tracing import get_tracer
+
+# Leading bytes of each supported file type
+FILE_SIGNATURES = {
+    'pdf': (b'%PDF-',),
+    'png': (b'\x89PNG\r\n\x1a\n',),
+    'jpg': (b'\xff\xd8\xff',),
+    'jpeg': (b'\xff\xd8\xff',),
+    'tiff': (b'II*\x00', b'MM\x00*'),
+}
+
+# Saved Textract output for a document, e.g. invoice.pdf.textract.json
+TEXTRACT_SIDECAR_SUFFIX = '.textract.json'
+
+CATEGORY_KEYWORDS = {
+    'invoice': ('invoice', 'amount due', 'total due', 'bill to', 'vat', 'payment terms'),
+    'receipt': ('receipt', 'paid', 'change due', 'cashier', 'thank you for your purchase'),
+    'report': ('report', 'quarterly', 'results', 'summary', 'analysis'),
+    'letter': ('dear', 'sincerely', 'yours faithfully', 'kind regards'),
+    'contract': ('agreement', 'hereby', 'party', 'terms and conditions', 'witness'),
+}
+DEFAULT_CATEGORY = 'other'
+
+_minhasher = MinHasher()
+_duplicate_index_lock = threading.Lock()
+
+_KEYWORD_PATTERNS = {
+    category: re.compile(r'\b(?:' + '|'.join(re.escape(k) for k in keywords) + r')\b', re.IGNORECASE)
+    for category, keywords in CATEGORY_KEYWORDS.items()
+}
+_PDF_STREAM = re.compile(rb'stream\r?\n(.*?)\r?\nendstream', re.DOTALL)
+_PDF_TEXT_OP = re.compile(rb'\(((?:\\.|[^\\)])*)\)\s*(Tj|\')|\[((?:\\.|[^\]])*)\]\s*TJ')
+_PDF_TJ_STRING = re.compile(rb'\(((?:\\.|[^\\)])*)\)')
+_PDF_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'(': b'(', b')': b')', b'\\': b'\\'}
+
+
+class DocumentRejected(Exception):
+    """Raised when a document fails the scan stage."""
+
+
+def scan_document(path):
+    """Check that the file's content matches its extension."""
+    extension = path.rsplit('.', 1)[-1].lower() if '.' in path else ''
+    signatures = FILE_SIGNATURES.get(extension)
+    if signatures is None:
+        raise DocumentRejected(f'Unsupported file type: {extension or "none"}')
+    with open(path, 'rb') as f:
+        header = f.read(8)
+    if not header.startswith(signatures):
+        raise DocumentRejected(f'File content does not match .{extension} extension')
+
+
+def _unescape_pdf_string(value):
+    return re.sub(rb'\\(.)', lambda m: _PDF_ESCAPES.get(m.group(1), m.group(1)), value)
+
+
+def extract_pdf_text(data):
+    """Return text drawn by Tj/TJ operators in a PDF's content streams.
+
+    This only covers PDFs with a text layer using simple fonts; scanned PDFs
+    need OCR through Textract.
+    """
+    lines = []
+    for match in _PDF_STREAM.finditer(data):
+        stream = match.group(1)
+        try:
+            stream = zlib.decompress(stream)
+        except zlib.error:
+            pass
+        for op in _PDF_TEXT_OP.finditer(stream):
+            if op.group(1) is not None:
+                parts = [op.group(1)]
+            else:
+                parts = _PDF_TJ_STRING.findall(op.group(3))
+            text = b''.join(_unescape_pdf_string(part) for part in parts)
+            lines.append(text.decode('latin-1'))
+    return '\n'.join(lines)
+
+
+def extract_document(path):
+    """Return ``(text, extraction)`` for a document.
+
+    ``extraction`` is a ColumnarExtraction when a saved Textract result sits
+    next to the file, otherwise None.
+    """
+    sidecar = path + TEXTRACT_SIDECAR_SUFFIX
+    if os.path.exists(sidecar):
+        with open(sidecar) as f:
+            extraction = ColumnarExtraction.from_textract(json.load(f))
+        return extraction.plain_text(), extraction
+
+    if path.lower().endswith('.pdf'):
+        with open(path, 'rb') as f:
+            return extract_pdf_text(f.read()), None
+    return '', None
+
+
+def categorise_text(text):
+    """Return the category whose keywords occur most often in the text."""
+    best, best_score = DEFAULT_CATEGORY, 0
+    for category, pattern in _KEYWORD_PATTERNS.items():
+        score = len(pattern.findall(text))
+        if score > best_score:
+            best, best_score = category, score
+    return best
+
+
+def process_document(path, job_id=None):
+    """Run the scan, extract and categorise stages for one file.
+
+    Returns a result dict; failures are reported in ``error`` rather than
+    raised so that one bad file does not stop a batch.
+    """
+    tracer = get_tracer()
+    result = {
+        'job_id': job_id or str(uuid.uuid4()),
+        'path': path,
+        'filename': os.path.basename(path),
+        'file_size': None,
+        'text': None,
+        'category': None,
+        'extraction': None,
+        'signature': None,
+        'duplicate_of': None,
+        'error': None,
+    }
+    with tracer.span('pipeline', job_id=result['job_id'], profile=True) as span:
+        try:
+            result['file_size'] = os.path.getsize(path)
+            with tracer.span('pipeline.scan'):
+                scan_document(path)
+            with tracer.span('pipeline.extract'):
+                result['text'], result['extraction'] = extract_document(path)
+                result['signature'] = _minhasher.signature(result['text'])
+            with tracer.span('pipeline.categorise'):
+                result['category'] = categorise_text(result['text'])
+        except (DocumentRejected, OSError, ValueError) as e:
+            result['error'] = str(e)
+            span.set_attribute('error', result['error'])
+        except Exception as e:
+            # Malformed input can fail anywhere in the stages; keep the batch going
+            result['error'] = f'{type(e).__name__}: {e}'
+            span.set_attribute('error', result['error'])
+    return result
+
+
+class DuplicateIndex:
+    """An LSH index of every signed document in the metadata store.
+
+    The index lives as long as the app. ``sync`` adds signatures stored since
+    its previous call, including those stored by other processes, by
+    remembering the last id read from the store's append-only signatures
+    table. Hold ``lock`` while syncing, querying and adding.
+    """
+
+    def __init__(self):
+        self.index = LSHIndex()
+        self.lock = threading.Lock()
+        self._last_id = 0
+
+    def sync(self):
+        """Add signatures stored since the last sync."""
+        for row_id, job_id, category, data in metadata_store.iter_signatures(self._last_id):
+            self.index.add(job_id, signature_from_bytes(data), category)
+            self._last_id = row_id
+
+
+def get_duplicate_index():
+    """Return the app's duplicate index, creating it on first use."""
+    with _duplicate_index_lock:
+        index = current_app.extensions.get('duplicate_index')
+        if index is None:
+            index = current_app.extensions['duplicate_index'] = DuplicateIndex()
+        return index
+
+
+def _record(job_id, result, email, status, **results):
+    # Uploaded documents already have a job row; backfilled ones do not
+    if metadata_store.get_job(job_id) is not None:
+        metadata_store.update_job(job_id, status=status, **results)
+    else:
+        metadata_store.create_job(job_id, result['filename'], email, result['file_size'],
+                                  status=status, **results)
+
+
+def store_result(result, email, extraction_folder=None, job_id=None, deduplicate=True):
+    """Record a processed document in the metadata store; return its job id.
+
+    The job created at upload is updated if it exists, otherwise a new job
+    is recorded.
+
+    Word geometry is saved to ``extraction_folder`` as ``<job_id>.dcol``.
+    Unless ``deduplicate`` is false, the document is checked against the
+    app's duplicate index: a near-duplicate takes the earlier document's
+    category and is flagged with ``duplicate_of`` (also set on ``result``).
+    The document is then added to the index.
+    """
+    job_id = job_id or result.get('job_id') or str(uuid.uuid4())
+    with get_tracer().span('pipeline.store', job_id=job_id):
+        if result['error'] is not None:
+            _record(job_id, result, email, 'failed')
+            return job_id
+
+        if result['extraction'] is not None and extraction_folder:
+            os.makedirs(extraction_folder, exist_ok=True)
+            result['extraction'].save(os.path.join(extraction_folder, f'{job_id}.dcol'))
+        category = result['category']
+        signature = result['signature']
+        duplicate = None
+        if deduplicate and signature is not None:
+            with get_tracer().span('pipeline.deduplicate'):
+                duplicates = get_duplicate_index()
+                with duplicates.lock:
+                    duplicates.sync()
+                    duplicate = duplicates.index.query(signature)
+                    if duplicate is not None:
+                        category = duplicate[1] or category
+                        result['duplicate_of'] = duplicate[0]
+                    duplicates.index.add(job_id, signature, category)
+
+        _record(
+            job_id, result, email, 'completed',
+            category=category, text=result['text'],
+            signature=signature.tobytes() if signature is not None else None,
+            duplicate_of=duplicate[0] if duplicate else None,
+            similarity=duplicate[2] if duplicate else None,
+        )
+    return job_id
@@ -0,0 +1,222 @@
+"""
+Priority and fair-share scheduling for the processing queue.
+
+Jobs are queued per priority class and, within a class, per tenant (the
+submitter's email address). Workers call ``next_job()``, which:
+
+1. serves priority classes in strict order, so small single-page documents
+   in the fast lane never wait behind bulk work;
+2. within a class, rotates between tenants with weighted round robin, each
+   tenant getting up to ``weight`` consecutive dispatches per turn;
+3. skips tenants that already have ``max_in_flight_per_tenant`` jobs being
+   processed; with the cap below the number of workers, one large submitter
+   cannot occupy every worker.
+
+Workers must call ``task_done(job)`` when a job finishes to release the
+tenant's in-flight slot.
+"""
+import re
+import threading
+import time
+from collections import deque
+
+PRIORITY_FAST = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2
+PRIORITY_NAMES = {
+    PRIORITY_FAST: 'fast',
+    PRIORITY_NORMAL: 'normal',
+    PRIORITY_BULK: 'bulk',
+}
+
+FAST_LANE_MAX_BYTES = 1024 * 1024
+BULK_MIN_BYTES = 8 * 1024 * 1024
+SINGLE_PAGE_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+
+_PDF_PAGE_PATTERN = re.compile(rb'/Type\s*/Page\b')
+
+
+def count_pdf_pages(path):
+    """Estimate the page count of a PDF by counting its page objects."""
+    with open(path, 'rb') as f:
+        return len(_PDF_PAGE_PATTERN.findall(f.read()))
+
+
+def classify_upload(path, file_size):
+    """Return the priority class for an uploaded file.
+
+    Small images and small single-page PDFs go to the fast lane; very large
+    files are treated as bulk work.
+    """
+    if file_size >= BULK_MIN_BYTES:
+        return PRIORITY_BULK
+    if file_size <= FAST_LANE_MAX_BYTES:
+        extension = path.rsplit('.', 1)[-1].lower()
+        if extension in SINGLE_PAGE_EXTENSIONS:
+            return PRIORITY_FAST
+        if extension == 'pdf' and count_pdf_pages(path) <= 1:
+            return PRIORITY_FAST
+    return PRIORITY_NORMAL
+
+
+class QueuedJob:
+    """A job waiting in, or dispatched from, the scheduler."""
+
+    __slots__ = ('job_id', 'tenant', 'priority', 'payload', 'enqueued_at', 'dispatched_at')
+
+    def __init__(self, job_id, tenant, priority, payload, enqueued_at):
+        self.job_id = job_id
+        self.tenant = tenant
+        self.priority = priority
+        self.payload = payload
+        self.enqueued_at = enqueued_at
+        self.dispatched_at = None
+
+    def __repr__(self):
+        return f'QueuedJob({self.job_id!r}, tenant={self.tenant!r}, priority={self.priority})'
+
+
+class _TenantStats:
+    __slots__ = ('queued', 'in_flight', 'dispatched', 'total_wait', 'max_wait')
+
+    def __init__(self):
+        self.queued = 0
+        self.in_flight = 0
+        self.dispatched = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+
+class _PriorityClass:
+    """Per-tenant queues for one priority class, visited round robin."""
+
+    def __init__(self):
+        self.queues = {}
+        self.ring = deque()
+        self.credits = {}
+        self.size = 0
+
+
+class FairScheduler:
+    """Thread-safe priority queue with weighted fair sharing between tenants."""
+
+    def __init__(self, max_in_flight_per_tenant=2, tenant_weights=None, default_weight=1,
+                 clock=time.monotonic):
+        self.max_in_flight_per_tenant = max_in_flight_per_tenant
+        self.tenant_weights = dict(tenant_weights or {})
+        self.default_weight = default_weight
+        self._clock = clock
+        self._classes = {priority: _PriorityClass() for priority in PRIORITY_NAMES}
+        self._stats = {}
+        self._condition = threading.Condition()
+
+    def _weight(self, tenant):
+        return max(1, self.tenant_weights.get(tenant, self.default_weight))
+
+    def submit(self, job_id, tenant, priority=PRIORITY_NORMAL, payload=None):
+        """Queue a job for a tenant and wake one waiting worker."""
+        if priority not in self._classes:
+            raise ValueError(f'Unknown priority class: {priority}')
+        job = QueuedJob(job_id, tenant, priority, payload, self._clock())
+        with self._condition:
+            queues = self._classes[priority]
+            queue = queues.queues.get(tenant)
+            if queue is None:
+                queue = queues.queues[tenant] = deque()
+                queues.ring.append(tenant)
+                queues.credits[tenant] = self._weight(tenant)
+            queue.append(job)
+            queues.size += 1
+            self._stats.setdefault(tenant, _TenantStats()).queued += 1
+            self._condition.notify()
+        return job
+
+    def _pop_eligible(self):
+        for priority in sorted(self._classes):
+            queues = self._classes[priority]
+            for _ in range(len(queues.ring)):
+                tenant = queues.ring[0]
+                if self._stats[tenant].in_flight >= self.max_in_flight_per_tenant:
+                    queues.ring.rotate(-1)
+                    continue
+
+                queue = queues.queues[tenant]
+                job = queue.popleft()
+                queues.size -= 1
+                queues.credits[tenant] -= 1
+                if not queue:
+                    queues.ring.popleft()
+                    del queues.queues[tenant]
+                    del queues.credits[tenant]
+                elif queues.credits[tenant] <= 0:
+                    queues.credits[tenant] = self._weight(tenant)
+                    queues.ring.rotate(-1)
+                return job
+        return None
+
+    def next_job(self, timeout=None):
+        """Return the next job to process, waiting up to ``timeout`` seconds.
+
+        Returns None if no eligible job became available in time.
+        """
+        deadline = None if timeout is None else self._clock() + timeout
+        with self._condition:
+            while True:
+                job = self._pop_eligible()
+                if job is not None:
+                    break
+                remaining = None if deadline is None else deadline - self._clock()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+
+            now = self._clock()
+            wait = now - job.enqueued_at
+            job.dispatched_at = now
+            stats = self._stats[job.tenant]
+            stats.queued -= 1
+            stats.in_flight += 1
+            stats.dispatched += 1
+            stats.total_wait += wait
+            stats.max_wait = max(stats.max_wait, wait)
+        return job
+
+    def task_done(self, job):
+        """Release the tenant slot held by a dispatched job."""
+        with self._condition:
+            self._stats[job.tenant].in_flight -= 1
+            # A tenant at its quota may now have eligible work
+            self._condition.notify()
+
+    def pending(self):
+        """Return the number of jobs waiting to be dispatched."""
+        with self._condition:
+            return sum(queues.size for queues in self._classes.values())
+
+    def metrics(self):
+        """Return queue depths and per-tenant wait times in seconds."""
+        with self._condition:
+            now = self._clock()
+            tenants = {}
+            for tenant, stats in self._stats.items():
+                oldest = [
+                    queues.queues[tenant][0].enqueued_at
+                    for queues in self._classes.values()
+                    if tenant in queues.queues
+                ]
+                tenants[tenant] = {
+                    'queued': stats.queued,
+                    'in_flight': stats.in_flight,
+                    'dispatched': stats.dispatched,
+                    'avg_wait_seconds': stats.total_wait / stats.dispatched if stats.dispatched else 0.0,
+                    'max_wait_seconds': stats.max_wait,
+                    'oldest_queued_seconds': now - min(oldest) if oldest else 0.0,
+                }
+            return {
+                'pending': sum(queues.size for queues in self._classes.values()),
+                'queued_by_priority': {
+                    PRIORITY_NAMES[priority]: queues.size
+                    for priority, queues in self._classes.items()
+                },
+                'tenants': tenants,
+            }
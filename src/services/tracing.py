@@ -0,0 +1,307 @@
+"""
+Lightweight tracing of upload requests and pipeline stages.
+
+Spans are tied to a ``job_id``: every span for the same job shares one trace
+id, derived from the job id, so the upload request and the later processing
+of its document appear as one trace. Finished spans are written as OTLP/JSON
+lines, the format read by the OpenTelemetry Collector's ``otlpjsonfile``
+receiver, so traces can be inspected locally or forwarded to any collector.
+
+Slow jobs can be profiled automatically: spans opened with ``profile=True``
+register their thread with a shared sampling profiler, and if the span takes
+longer than the threshold its samples are written as folded stacks
+(``<profile_folder>/<job_id>.<span name>.folded``) ready for flame graph tools.
+
+Tracing is configured from the environment on first use (so that worker
+processes pick up the same settings) or explicitly with ``configure()``:
+
+* ``TRACE_EXPORT_PATH``        - file to append spans to; tracing is off if unset
+* ``SLOW_JOB_PROFILE_SECONDS`` - profile jobs slower than this; off if unset
+* ``PROFILE_FOLDER``           - where profiles are written (default ``profiles``)
+"""
+import contextvars
+import hashlib
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+SERVICE_NAME = 'document-categoriser'
+
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+def trace_id_for_job(job_id):
+    """Return the 32-hex-digit trace id used for every span of a job."""
+    try:
+        return uuid.UUID(job_id).hex
+    except (ValueError, TypeError, AttributeError):
+        return hashlib.sha256(str(job_id).encode('utf-8')).hexdigest()[:32]
+
+
+def _attribute_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class Span:
+    """A timed operation; use through ``Tracer.span()``."""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_span_id', 'attributes',
+                 'start_ns', 'end_ns', 'status', 'status_message')
+
+    def __init__(self, name, trace_id, parent_span_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = STATUS_UNSET
+        self.status_message = None
+
+    @property
+    def duration(self):
+        """Span duration in seconds, or None while it is still open."""
+        return None if self.end_ns is None else (self.end_ns - self.start_ns) / 1e9
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def to_otlp(self):
+        """Return the span as an OTLP/JSON span object."""
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': 1,  # SPAN_KIND_INTERNAL
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [
+                {'key': key, 'value': _attribute_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            'status': {'code': self.status},
+        }
+        if self.parent_span_id:
+            span['parentSpanId'] = self.parent_span_id
+        if self.status_message:
+            span['status']['message'] = self.status_message
+        return span
+
+
+class _NoopSpan:
+    """Returned when tracing and profiling are both disabled."""
+
+    def set_attribute(self, key, value):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class JsonLinesExporter:
+    """Appends each finished span to a file as one OTLP/JSON line."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._resource = {
+            'attributes': [{'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}}]
+        }
+
+    def export(self, span):
+        line = json.dumps({
+            'resourceSpans': [{
+                'resource': self._resource,
+                'scopeSpans': [{
+                    'scope': {'name': __name__},
+                    'spans': [span.to_otlp()],
+                }],
+            }],
+        }, separators=(',', ':')) + '\n'
+        # One write per line in append mode, so concurrent workers do not
+        # interleave partial records
+        with self._lock, open(self.path, 'a') as f:
+            f.write(line)
+
+
+class _ProfileSession:
+    __slots__ = ('job_id', 'name', 'thread_id', 'samples')
+
+    def __init__(self, job_id, name, thread_id):
+        self.job_id = job_id
+        self.name = name
+        self.thread_id = thread_id
+        self.samples = Counter()
+
+
+class SamplingProfiler:
+    """Samples the stacks of registered threads from one background thread."""
+
+    def __init__(self, threshold, folder, interval=0.005):
+        self.threshold = threshold
+        self.folder = folder
+        self.interval = interval
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, job_id, name):
+        """Start sampling the calling thread for span ``name`` of ``job_id``."""
+        session = _ProfileSession(job_id, name, threading.get_ident())
+        with self._lock:
+            self._sessions[session.thread_id] = session
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='sampling-profiler',
+                                                daemon=True)
+                self._thread.start()
+        return session
+
+    def stop(self, session, duration):
+        """Stop sampling; write the profile if the job exceeded the threshold.
+
+        Returns the path of the written profile, or None.
+        """
+        with self._lock:
+            self._sessions.pop(session.thread_id, None)
+        if duration < self.threshold or not session.samples:
+            return None
+        os.makedirs(self.folder, exist_ok=True)
+        path = os.path.join(self.folder, f'{session.job_id}.{session.name}.folded')
+        with open(path, 'w') as f:
+            for stack, count in session.samples.most_common():
+                f.write(f'{stack} {count}\n')
+        return path
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._sessions:
+                    self._thread = None
+                    return
+                frames = sys._current_frames()
+                for thread_id, session in self._sessions.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        session.samples[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+
+class Tracer:
+    """Creates spans and hands finished ones to an exporter."""
+
+    def __init__(self, exporter=None, profiler=None):
+        self.exporter = exporter
+        self.profiler = profiler
+
+    @property
+    def enabled(self):
+        return self.exporter is not None or self.profiler is not None
+
+    def span(self, name, job_id=None, profile=False, **attributes):
+        """Return a context manager timing ``name`` as a child of the current span.
+
+        With ``profile=True`` the span is sampled by the slow-job profiler.
+        """
+        return _SpanContext(self, name, job_id, profile, attributes)
+
+
+class _SpanContext:
+    __slots__ = ('tracer', 'name', 'job_id', 'profile', 'attributes',
+                 'span', 'token', 'session')
+
+    def __init__(self, tracer, name, job_id, profile, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.job_id = job_id
+        self.profile = profile
+        self.attributes = attributes
+        self.session = None
+
+    def __enter__(self):
+        if not self.tracer.enabled:
+            self.span = None
+            return _NOOP_SPAN
+
+        parent = _current_span.get()
+        job_id = self.job_id
+        if job_id is None and parent is not None:
+            job_id = parent.attributes.get('job.id')
+        if job_id is not None:
+            trace_id = trace_id_for_job(job_id)
+            self.attributes['job.id'] = job_id
+        elif parent is not None:
+            trace_id = parent.trace_id
+        else:
+            trace_id = secrets.token_hex(16)
+
+        parent_id = parent.span_id if parent is not None and parent.trace_id == trace_id else None
+        self.span = Span(self.name, trace_id, parent_id, self.attributes)
+        self.token = _current_span.set(self.span)
+        if self.profile and self.tracer.profiler is not None:
+            self.session = self.tracer.profiler.start(job_id or self.span.span_id, self.name)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        span = self.span
+        if span is None:
+            return False
+        span.end_ns = time.time_ns()
+        _current_span.reset(self.token)
+        if exc_type is not None:
+            span.status = STATUS_ERROR
+            span.status_message = f'{exc_type.__name__}: {exc}'
+        if self.session is not None:
+            profile_path = self.tracer.profiler.stop(self.session, span.duration)
+            if profile_path:
+                span.attributes['profile.path'] = profile_path
+        if self.tracer.exporter is not None:
+            self.tracer.exporter.export(span)
+        return False
+
+
+_tracer = None
+
+
+def configure(export_path=None, profile_threshold=None, profile_folder='profiles'):
+    """Replace the global tracer; pass nothing to disable tracing."""
+    global _tracer
+    exporter = JsonLinesExporter(export_path) if export_path else None
+    profiler = SamplingProfiler(profile_threshold, profile_folder) \
+        if profile_threshold is not None else None
+    _tracer = Tracer(exporter, profiler)
+    return _tracer
+
+
+def get_tracer():
+    """Return the global tracer, configuring it from the environment if needed."""
+    if _tracer is None:
+        threshold = os.environ.get('SLOW_JOB_PROFILE_SECONDS')
+        configure(export_path=os.environ.get('TRACE_EXPORT_PATH'),
+                  profile_threshold=float(threshold) if threshold else None,
+                  profile_folder=os.environ.get('PROFILE_FOLDER', 'profiles'))
+    return _tracer
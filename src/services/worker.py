@@ -0,0 +1,70 @@
+"""
+Background threads that drain the processing queue.
+
+Each thread takes the next job from the FairScheduler, runs it through the
+pipeline inside an application context, records the result against the job
+created at upload, and releases the job's tenant slot. Threads are started
+lazily in the process that serves uploads, so they are created after any
+gunicorn fork.
+"""
+import threading
+
+from services.pipeline import process_document, store_result
+
+
+class ProcessingWorkers:
+    """A small pool of daemon threads consuming scheduler jobs."""
+
+    def __init__(self, app, scheduler, threads=2, poll_interval=1.0):
+        self.app = app
+        self.scheduler = scheduler
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self._workers = []
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.threads > 0
+
+    def ensure_started(self):
+        """Start the worker threads if they are not already running."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._workers = [worker for worker in self._workers if worker.is_alive()]
+            self._stopping.clear()
+            for i in range(len(self._workers), self.threads):
+                worker = threading.Thread(target=self._run, name=f'processing-worker-{i}',
+                                          daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def stop(self, timeout=None):
+        """Ask the threads to exit after their current job and wait for them."""
+        self._stopping.set()
+        with self._lock:
+            for worker in self._workers:
+                worker.join(timeout)
+            self._workers = []
+
+    def process_next(self, timeout=None):
+        """Process one queued job; return it, or None if none was available."""
+        job = self.scheduler.next_job(timeout=timeout)
+        if job is None:
+            return None
+        try:
+            with self.app.app_context():
+                result = process_document(job.payload, job_id=job.job_id)
+                store_result(result, job.tenant,
+                             extraction_folder=self.app.config['EXTRACTION_FOLDER'])
+        except Exception:
+            self.app.logger.exception(f'Processing failed for job {job.job_id}')
+        finally:
+            self.scheduler.task_done(job)
+        return job
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self.process_next(timeout=self.poll_interval)
@@ -207,6 +207,10 @@ variable "container_environment_variables" {
     {
       name  = "PYTHONUNBUFFERED"
       value = "1"
+    },
+    {
+      name  = "TRUSTED_PROXY_HOPS"
+      value = "1"
     }
   ]
 }
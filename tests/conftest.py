@@ -18,6 +18,13 @@ def app():
     flask_app.config['TESTING'] = True
     flask_app.config['WTF_CSRF_ENABLED'] = False
     flask_app.config['UPLOAD_FOLDER'] = tempfile.mkdtemp()
+    # Uploads are processed synchronously in tests that need it
+    flask_app.config['PROCESSING_WORKERS'] = 0
+    flask_app.config['ADMIN_TOKEN'] = 'test-admin-token'
+    # Start every test with fresh upload rate limits
+    flask_app.extensions['admission'].reset()
+    # The duplicate index mirrors the previous test's database
+    flask_app.extensions.pop('duplicate_index', None)
     
     with flask_app.app_context():
         yield flask_app
@@ -140,4 +140,30 @@ Thank you for your attention to this matter.
 Sincerely,
 John Doe
 Financial Analyst
-"""
\ No newline at end of file
+"""
+# Sample invoice text for field extraction tests
+SAMPLE_INVOICE_TEXT = """
+ABC Company
+123 Main Street
+Anytown, ST 12345
+
+INVOICE
+Invoice No: INV-2025-0042
+Invoice Date: 19/09/2025
+Due Date: October 19, 2025
+
+Description          Qty   Unit Price   Amount
+Consulting services  10    150.00       1,500.00
+Travel expenses      1     $245.50      $245.50
+
+Subtotal: 1,745.50
+VAT: 349.10
+Total Due: £2,094.60
+"""
+
+
+def make_pdf(text):
+    """Build a minimal PDF whose text layer holds one line per Tj operator."""
+    operators = b' '.join(b'(' + line.encode('latin-1') + b') Tj'
+                          for line in text.splitlines() if line.strip())
+    return b'%PDF-1.4\n1 0 obj\n<< >>\nstream\nBT ' + operators + b' ET\nendstream\nendobj\n%%EOF'
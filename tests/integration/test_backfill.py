@@ -0,0 +1,115 @@
+"""
+Integration tests for the offline backfill command.
+These run documents through the pipeline without going through HTTP.
+"""
+import pytest
+import json
+import os
+
+from services import metadata_store
+from tests.fixtures.mock_data import SAMPLE_INVOICE_TEXT, SAMPLE_TEXTRACT_RESPONSE, make_pdf
+
+INVOICE_PDF = (
+    b"%PDF-1.4\n1 0 obj\n<< /Length 80 >>\nstream\n"
+    b"BT (INVOICE) Tj (Invoice No: INV-7) Tj (Total Due: 120.00) Tj ET\n"
+    b"endstream\nendobj\n%%EOF"
+)
+
+
+@pytest.fixture
+def archive(tmp_path):
+    """A small folder of legacy documents."""
+    folder = tmp_path / 'archive'
+    (folder / '2024').mkdir(parents=True)
+    (folder / 'invoice.pdf').write_bytes(INVOICE_PDF)
+    (folder / '2024' / 'scan.png').write_bytes(b'\x89PNG\r\n\x1a\n\x00\x00')
+    (folder / '2024' / 'scan.png.textract.json').write_text(json.dumps(SAMPLE_TEXTRACT_RESPONSE))
+    (folder / '2024' / 'fake.pdf').write_bytes(b'not really a pdf')
+    (folder / 'notes.txt').write_text('ignored')
+    return folder
+
+
+def _jobs():
+    return {job['filename']: job for job in metadata_store.iter_jobs()}
+
+
+class TestBackfill:
+    """Test the backfill CLI command."""
+
+    def test_backfill_directory(self, app, runner, archive, tmp_path):
+        """Test processing every supported document in a folder."""
+        app.config['EXTRACTION_FOLDER'] = str(tmp_path / 'extractions')
+
+        result = runner.invoke(args=['backfill', str(archive), '--workers', '0'])
+
+        assert result.exit_code == 0, result.output
+        assert 'Processed 3 documents (1 failed' in result.output
+        assert 'docs/sec' in result.output
+
+        jobs = _jobs()
+        assert set(jobs) == {'invoice.pdf', 'scan.png', 'fake.pdf'}
+        assert jobs['invoice.pdf']['category'] == 'invoice'
+        assert jobs['invoice.pdf']['email'] == 'backfill@localhost'
+        assert jobs['fake.pdf']['status'] == 'failed'
+        assert len(os.listdir(tmp_path / 'extractions')) == 1
+
+    def test_backfill_resumes_from_checkpoint(self, runner, archive, tmp_path):
+        """Test that a rerun with the same checkpoint skips finished documents."""
+        checkpoint = tmp_path / 'progress.txt'
+        checkpoint.write_text(str(archive / 'invoice.pdf') + '\n')
+
+        result = runner.invoke(args=['backfill', str(archive), '--workers', '0',
+                                     '--checkpoint', str(checkpoint)])
+
+        assert result.exit_code == 0, result.output
+        assert '1 already done' in result.output
+        assert 'invoice.pdf' not in _jobs()
+        assert len(checkpoint.read_text().splitlines()) == 3
+
+    def test_checkpoint_paths_are_normalised(self, runner, archive, tmp_path, monkeypatch):
+        """Test that skips are counted per matching document, not per checkpoint line."""
+        monkeypatch.chdir(tmp_path)
+        checkpoint = tmp_path / 'progress.txt'
+        checkpoint.write_text(
+            os.path.join('archive', '2024', '..', 'invoice.pdf') + '\n'
+            + str(tmp_path / 'elsewhere' / 'gone.pdf') + '\n'
+        )
+
+        result = runner.invoke(args=['backfill', 'archive', '--workers', '0',
+                                     '--checkpoint', str(checkpoint)])
+
+        assert result.exit_code == 0, result.output
+        assert 'Processed 2 documents' in result.output
+        assert '1 already done' in result.output
+        assert 'invoice.pdf' not in _jobs()
+        written = checkpoint.read_text().splitlines()[2:]
+        assert sorted(written) == [str(archive / '2024' / 'fake.pdf'),
+                                   str(archive / '2024' / 'scan.png')]
+
+    def test_backfill_flags_near_duplicates(self, runner, tmp_path):
+        """Test that a re-exported document is flagged and reuses the category."""
+        folder = tmp_path / 'rescans'
+        folder.mkdir()
+        rescanned = SAMPLE_INVOICE_TEXT.replace('Travel expenses', 'Trave1 expenses')
+        (folder / 'a_original.pdf').write_bytes(make_pdf(SAMPLE_INVOICE_TEXT))
+        (folder / 'b_rescan.pdf').write_bytes(make_pdf(rescanned))
+
+        result = runner.invoke(args=['backfill', str(folder), '--workers', '0'])
+
+        assert result.exit_code == 0, result.output
+        assert '1 likely duplicates' in result.output
+        jobs = _jobs()
+        assert jobs['b_rescan.pdf']['duplicate_of'] == jobs['a_original.pdf']['job_id']
+        assert jobs['b_rescan.pdf']['category'] == 'invoice'
+        assert jobs['b_rescan.pdf']['similarity'] >= 0.8
+        assert jobs['a_original.pdf']['duplicate_of'] is None
+
+    def test_backfill_manifest_with_process_pool(self, runner, archive, tmp_path):
+        """Test processing a manifest file with worker processes."""
+        manifest = archive / 'manifest.txt'
+        manifest.write_text('# legacy invoices\ninvoice.pdf\n')
+
+        result = runner.invoke(args=['backfill', str(manifest), '--workers', '2'])
+
+        assert result.exit_code == 0, result.output
+        assert _jobs()['invoice.pdf']['status'] == 'completed'
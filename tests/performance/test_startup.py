@@ -0,0 +1,83 @@
+"""
+Startup benchmark: time from a fresh interpreter to the first healthy
+response. This is what a new gunicorn worker or a cold App Runner instance
+pays before it can serve traffic.
+
+Run directly to print the measurement:
+    python tests/performance/test_startup.py
+"""
+import json
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'src')
+
+# Modules that must not be loaded just to answer /health
+LAZY_MODULES = (
+    'services.pipeline',
+    'services.backfill',
+    'services.export',
+    'services.extraction_store',
+    'services.field_extraction',
+    'concurrent.futures.process',
+)
+
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {src!r})
+from app import app
+imported = time.perf_counter()
+response = app.test_client().get('/health')
+healthy = time.perf_counter()
+print(json.dumps({{
+    'status_code': response.status_code,
+    'import_seconds': imported - start,
+    'first_healthy_seconds': healthy - start,
+    'loaded_lazy_modules': [m for m in {lazy!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure_startup(workdir):
+    """Start a fresh interpreter and return its startup measurements."""
+    script = STARTUP_SCRIPT.format(src=os.path.abspath(SRC_DIR), lazy=LAZY_MODULES)
+    env = dict(os.environ, DATABASE=os.path.join(workdir, 'startup.db'))
+    output = subprocess.run([sys.executable, '-c', script], cwd=workdir, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output)
+
+
+class TestStartup:
+    """Startup time tests."""
+
+    def test_time_to_first_healthy_response(self, tmp_path):
+        """Test that a fresh process answers /health quickly."""
+        result = measure_startup(str(tmp_path))
+
+        print(f"\nStartup: import {result['import_seconds'] * 1000:.0f}ms, "
+              f"first healthy response {result['first_healthy_seconds'] * 1000:.0f}ms")
+        assert result['status_code'] == 200
+        assert result['first_healthy_seconds'] < 2.0
+
+    def test_health_does_not_import_heavy_modules(self, tmp_path):
+        """Test that processing modules are only imported on first use."""
+        result = measure_startup(str(tmp_path))
+
+        assert result['loaded_lazy_modules'] == []
+
+    def test_compile_templates(self, runner, tmp_path):
+        """Test that templates can be precompiled into Python modules."""
+        target = tmp_path / 'compiled'
+
+        result = runner.invoke(args=['compile-templates', str(target)])
+
+        assert result.exit_code == 0, result.output
+        assert len(list(target.glob('tmpl_*.py'))) == 5
+
+
+if __name__ == '__main__':
+    import tempfile
+    with tempfile.TemporaryDirectory() as workdir:
+        print(json.dumps(measure_startup(workdir), indent=2))
@@ -0,0 +1,113 @@
+import pytest
+import sys
+import os
+
+# Add src to path so we can import our service modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+from werkzeug.exceptions import TooManyRequests
+
+from services.admission import AdmissionController, InMemoryRateLimiter
+
+
+class FakeClock:
+    """Manually advanced clock for deterministic token refills."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_controller(clock=None, rate=1.0, burst=2, per_client=2, total=3, **kwargs):
+    limiter = InMemoryRateLimiter(rate, burst, clock=clock or FakeClock())
+    return AdmissionController(limiter, per_client, total, **kwargs)
+
+
+class TestInMemoryRateLimiter:
+    """Test the in-memory token bucket."""
+
+    def test_burst_then_refill(self):
+        """Test that the burst is allowed and tokens refill at the rate."""
+        clock = FakeClock()
+        limiter = InMemoryRateLimiter(rate=2.0, burst=2, clock=clock)
+
+        assert limiter.take('client') == 0
+        assert limiter.take('client') == 0
+        assert limiter.take('client') == pytest.approx(0.5)
+
+        clock.now = 0.5
+        assert limiter.take('client') == 0
+
+    def test_clients_are_independent(self):
+        """Test that one client exhausting its bucket does not affect others."""
+        limiter = InMemoryRateLimiter(rate=1.0, burst=1, clock=FakeClock())
+
+        assert limiter.take('a') == 0
+        assert limiter.take('a') > 0
+        assert limiter.take('b') == 0
+
+    def test_least_recently_used_bucket_is_evicted(self):
+        """Test that the table is bounded and drops the least recently used client."""
+        clock = FakeClock()
+        limiter = InMemoryRateLimiter(rate=1.0, burst=1, max_clients=2, clock=clock)
+        limiter.take('a')
+        limiter.take('b')
+        limiter.take('a')
+
+        limiter.take('c')
+        assert list(limiter._buckets) == ['a', 'c']
+
+        # 'a' keeps its (empty) bucket; evicted 'b' starts afresh
+        assert limiter.take('a') > 0
+        assert limiter.take('b') == 0
+        assert len(limiter._buckets) == 2
+
+
+class TestAdmissionController:
+    """Test upload admission decisions."""
+
+    def test_rate_limit_sets_retry_after(self):
+        """Test that exceeding the rate raises 429 with Retry-After."""
+        controller = make_controller(burst=1, rate=0.5)
+        controller.acquire('client')
+        controller.release('client')
+
+        with pytest.raises(TooManyRequests) as excinfo:
+            controller.acquire('client')
+        assert excinfo.value.retry_after == 2
+
+    def test_per_client_concurrency(self):
+        """Test the cap on simultaneous uploads from one client."""
+        controller = make_controller(burst=10, per_client=2)
+        controller.acquire('client')
+        controller.acquire('client')
+
+        with pytest.raises(TooManyRequests):
+            controller.acquire('client')
+
+        controller.release('client')
+        controller.acquire('client')
+
+    def test_global_concurrency(self):
+        """Test the cap on simultaneous uploads across all clients."""
+        controller = make_controller(burst=10, per_client=5, total=2)
+        controller.acquire('a')
+        controller.acquire('b')
+
+        with pytest.raises(TooManyRequests):
+            controller.acquire('c')
+
+    def test_sheds_load_when_backlog_full(self):
+        """Test that uploads are rejected while the backlog is over threshold."""
+        backlog = [5]
+        controller = make_controller(burst=10, max_backlog=5,
+                                     backlog=lambda: backlog[0], backlog_retry_after=60)
+
+        with pytest.raises(TooManyRequests) as excinfo:
+            controller.acquire('client')
+        assert excinfo.value.retry_after == 60
+
+        backlog[0] = 4
+        controller.acquire('client')
@@ -0,0 +1,146 @@
+import pytest
+import csv
+import gzip
+import io
+import json
+import sys
+import os
+
+# Add src to path so we can import our service modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+from services import metadata_store
+from services.export import gzip_chunks
+from tests.fixtures.mock_data import SAMPLE_INVOICE_TEXT
+
+ADMIN = {'Authorization': 'Bearer test-admin-token'}
+
+
+@pytest.fixture
+def jobs(app):
+    """Populate the metadata store with a few categorised jobs."""
+    db = metadata_store.get_db()
+    rows = [
+        ('job-1', 'a.pdf', 'finance@example.com', 'invoice', SAMPLE_INVOICE_TEXT, '2025-09-01T10:00:00'),
+        ('job-2', 'b.pdf', 'finance@example.com', 'report', 'Quarterly report', '2025-09-15T10:00:00'),
+        ('job-3', 'c.pdf', 'other@example.com', 'invoice', SAMPLE_INVOICE_TEXT, '2025-09-30T23:59:59'),
+        ('job-4', 'd.pdf', 'finance@example.com', 'invoice', SAMPLE_INVOICE_TEXT, '2025-10-01T00:00:00'),
+    ]
+    for job_id, filename, email, category, text, created_at in rows:
+        db.execute(
+            'INSERT INTO jobs (job_id, filename, email, file_size, status, category, text,'
+            ' created_at, updated_at) VALUES (?, ?, ?, 100, ?, ?, ?, ?, ?)',
+            (job_id, filename, email, 'completed', category, text, created_at, created_at),
+        )
+    db.commit()
+
+
+class TestExport:
+    """Test the bulk results export."""
+
+    def test_iter_jobs_pages_in_order(self, jobs):
+        """Test keyset pagination returns every job exactly once, in order."""
+        results = list(metadata_store.iter_jobs(page_size=1))
+        assert [job['job_id'] for job in results] == ['job-1', 'job-2', 'job-3', 'job-4']
+        assert 'text' not in results[0]
+
+    def test_jsonl_export_with_filters(self, client, jobs):
+        """Test filtering a JSONL export by month and category."""
+        response = client.get('/export?format=jsonl&from=2025-09-01&to=2025-09-30&category=invoice', headers=ADMIN)
+
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        records = [json.loads(line) for line in response.data.decode().splitlines()]
+        assert [record['job_id'] for record in records] == ['job-1', 'job-3']
+        assert records[0]['fields']['total'] == '2094.60'
+        assert 'text' not in records[0]
+
+    def test_csv_export_by_email(self, client, jobs):
+        """Test a CSV export filtered by submitter email."""
+        response = client.get('/export?format=csv&email=FINANCE@example.com', headers=ADMIN)
+
+        rows = list(csv.DictReader(io.StringIO(response.data.decode())))
+        assert [row['job_id'] for row in rows] == ['job-1', 'job-2', 'job-4']
+        assert json.loads(rows[0]['fields'])['invoice_number'] == 'INV-2025-0042'
+        assert rows[1]['fields'] == ''
+
+    def test_gzip_export(self, client, jobs):
+        """Test that exports are compressed when the client accepts gzip."""
+        response = client.get('/export?format=jsonl', headers={'Accept-Encoding': 'gzip', **ADMIN})
+
+        assert response.headers['Content-Encoding'] == 'gzip'
+        lines = gzip.decompress(response.data).decode().splitlines()
+        assert len(lines) == 4
+
+    def test_invalid_parameters(self, client):
+        """Test that unsupported formats and bad dates are rejected."""
+        assert client.get('/export?format=xml', headers=ADMIN).status_code == 400
+        assert client.get('/export?from=September', headers=ADMIN).status_code == 400
+
+    def test_export_requires_admin_token(self, client, jobs):
+        """Test that exports are refused without the admin token."""
+        assert client.get('/export').status_code == 401
+        wrong = {'Authorization': 'Bearer wrong'}
+        assert client.get('/export', headers=wrong).status_code == 401
+
+    def test_csv_formula_cells_are_escaped(self, client, jobs):
+        """Test that cells a spreadsheet would evaluate are quoted."""
+        db = metadata_store.get_db()
+        db.execute(
+            "INSERT INTO jobs (job_id, filename, email, file_size, status, created_at, updated_at)"
+            " VALUES ('job-5', '=HYPERLINK(\"http://x\")', '@evil@example.com', -1, 'completed',"
+            " '2025-11-01T00:00:00', '2025-11-01T00:00:00')"
+        )
+        db.commit()
+        response = client.get('/export?format=csv&from=2025-11-01', headers=ADMIN)
+
+        row = next(csv.DictReader(io.StringIO(response.data.decode())))
+        assert row['filename'] == "'=HYPERLINK(\"http://x\")"
+        assert row['email'] == "'@evil@example.com"
+        assert row['file_size'] == '-1'
+
+    def test_gzip_chunks_flushes_incrementally(self):
+        """Test that large streams are emitted in several compressed chunks."""
+        lines = (f'line {i}\n' for i in range(20000))
+        chunks = list(gzip_chunks(lines, min_chunk_size=1024))
+
+        assert len(chunks) > 2
+        assert gzip.decompress(b''.join(chunks)).decode().count('\n') == 20000
+
+
+class TestMetadataStoreSchema:
+    """Test metadata store schema upgrades."""
+
+    def test_columns_added_to_existing_database(self, app):
+        """Test that databases created before later columns are upgraded."""
+        import sqlite3
+        db = sqlite3.connect(app.config['DATABASE'])
+        db.execute('CREATE TABLE jobs (job_id TEXT PRIMARY KEY, filename TEXT NOT NULL,'
+                   ' email TEXT NOT NULL, file_size INTEGER, status TEXT NOT NULL,'
+                   ' category TEXT, text TEXT, created_at TEXT NOT NULL,'
+                   ' updated_at TEXT NOT NULL)')
+        db.close()
+
+        metadata_store.create_job('job-1', 'a.pdf', 'a@example.com', 1, similarity=0.5)
+        assert metadata_store.get_job('job-1')['similarity'] == 0.5
+
+    def test_existing_signatures_copied_to_signatures_table(self, app):
+        """Test that signatures stored before the signatures table are carried over."""
+        import sqlite3
+        db = sqlite3.connect(app.config['DATABASE'])
+        db.execute('CREATE TABLE jobs (job_id TEXT PRIMARY KEY, filename TEXT NOT NULL,'
+                   ' email TEXT NOT NULL, file_size INTEGER, status TEXT NOT NULL,'
+                   ' category TEXT, text TEXT, created_at TEXT NOT NULL,'
+                   ' updated_at TEXT NOT NULL, signature BLOB, duplicate_of TEXT,'
+                   ' similarity REAL)')
+        db.execute("INSERT INTO jobs VALUES ('job-1', 'a.pdf', 'a@example.com', 1, 'completed',"
+                   " 'invoice', NULL, '2025-09-01', '2025-09-01', X'01000000', NULL, NULL)")
+        db.commit()
+        db.close()
+
+        metadata_store.create_job('job-2', 'b.pdf', 'a@example.com', 1, signature=b'\x02\x00\x00\x00')
+
+        rows = list(metadata_store.iter_signatures())
+        assert [(job_id, category) for _, job_id, category, _ in rows] == \
+            [('job-1', 'invoice'), ('job-2', None)]
+        assert list(metadata_store.iter_signatures(after_id=rows[0][0]))[0][1] == 'job-2'
@@ -0,0 +1,89 @@
+import pytest
+import sys
+import os
+
+# Add src to path so we can import our service modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+from services.extraction_store import ColumnarExtraction, ExtractionFormatError
+from tests.fixtures.mock_data import SAMPLE_TEXTRACT_RESPONSE
+
+
+class TestColumnarExtraction:
+    """Test the columnar extraction store."""
+
+    def test_from_textract_builds_columns(self):
+        """Test converting a Textract response into columns."""
+        extraction = ColumnarExtraction.from_textract(SAMPLE_TEXTRACT_RESPONSE)
+
+        assert len(extraction) == 3
+        assert extraction.pages == 1
+        assert extraction.block_types == ['PAGE', 'WORD']
+        assert extraction.plain_text() == 'Sample Document'
+
+    def test_round_trip_to_blocks(self):
+        """Test converting back to Textract-shaped blocks."""
+        extraction = ColumnarExtraction.from_textract(SAMPLE_TEXTRACT_RESPONSE)
+        blocks = extraction.to_blocks()
+
+        for original, restored in zip(SAMPLE_TEXTRACT_RESPONSE['Blocks'], blocks):
+            assert restored['BlockType'] == original['BlockType']
+            assert restored['Id'] == original['Id']
+            assert restored.get('Text') == original.get('Text')
+            for key, value in original['Geometry']['BoundingBox'].items():
+                assert restored['Geometry']['BoundingBox'][key] == pytest.approx(value, abs=1e-6)
+            if 'Confidence' in original:
+                assert restored['Confidence'] == pytest.approx(original['Confidence'], abs=1e-4)
+            else:
+                assert 'Confidence' not in restored
+
+    @pytest.mark.parametrize('use_mmap', [True, False])
+    def test_save_and_load(self, tmp_path, use_mmap):
+        """Test that saved files load back with identical contents."""
+        path = tmp_path / 'result.dcol'
+        extraction = ColumnarExtraction.from_textract(SAMPLE_TEXTRACT_RESPONSE)
+        extraction.save(path)
+
+        with ColumnarExtraction.load(path, use_mmap=use_mmap) as loaded:
+            assert loaded.to_blocks() == extraction.to_blocks()
+            words = list(loaded.word_boxes(page=1))
+            assert [word[0] for word in words] == ['Sample', 'Document']
+            assert words[1][1] == pytest.approx(0.25)
+
+    def test_interned_strings(self):
+        """Test that repeated words are stored once in the string table."""
+        blocks = [
+            {'BlockType': 'WORD', 'Text': 'Total', 'Id': f'word-{i}'}
+            for i in range(5)
+        ]
+        extraction = ColumnarExtraction.from_textract({'Blocks': blocks})
+
+        assert extraction.strings.count('Total') == 1
+        assert len(set(extraction.text)) == 1
+
+    def test_too_many_block_types(self):
+        """Test that block types beyond the uint8 code range are rejected."""
+        blocks = [{'BlockType': f'TYPE_{i}'} for i in range(257)]
+
+        with pytest.raises(ExtractionFormatError):
+            ColumnarExtraction.from_textract({'Blocks': blocks})
+
+    def test_load_rejects_other_files(self, tmp_path):
+        """Test that non-columnar files are rejected."""
+        path = tmp_path / 'result.json'
+        path.write_bytes(b'{"Blocks": []}')
+
+        with pytest.raises(ExtractionFormatError):
+            ColumnarExtraction.load(path)
+
+    @pytest.mark.parametrize('use_mmap', [True, False])
+    @pytest.mark.parametrize('size', [0, 5, 16, -8])
+    def test_load_rejects_empty_and_truncated_files(self, tmp_path, use_mmap, size):
+        """Test that short files raise ExtractionFormatError, not buffer or struct errors."""
+        path = tmp_path / 'result.dcol'
+        ColumnarExtraction.from_textract(SAMPLE_TEXTRACT_RESPONSE).save(path)
+        data = path.read_bytes()
+        path.write_bytes(data[:size])
+
+        with pytest.raises(ExtractionFormatError):
+            ColumnarExtraction.load(path, use_mmap=use_mmap)
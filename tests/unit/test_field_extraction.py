@@ -0,0 +1,64 @@
+import pytest
+import sys
+import os
+
+# Add src to path so we can import our service modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+from services import field_extraction
+from services.field_extraction import extract_fields, missing_fields
+from tests.fixtures.mock_data import SAMPLE_INVOICE_TEXT, SAMPLE_EXTRACTED_TEXT
+
+
+class TestFieldExtraction:
+    """Test local key-value and table extraction."""
+
+    def test_invoice_fields(self):
+        """Test extracting the main invoice fields."""
+        fields = extract_fields(SAMPLE_INVOICE_TEXT, 'invoice').to_dict()
+
+        assert fields['invoice_number'] == 'INV-2025-0042'
+        assert fields['total'] == '2094.60'
+        assert fields['dates'] == ['2025-09-19', '2025-10-19']
+
+    def test_invoice_line_items(self):
+        """Test extracting table rows from an invoice."""
+        items = extract_fields(SAMPLE_INVOICE_TEXT, 'invoice')['line_items']
+
+        assert items == [
+            {'description': 'Consulting services', 'quantity': '10',
+             'unit_price': '150.00', 'amount': '1500.00'},
+            {'description': 'Travel expenses', 'quantity': '1',
+             'unit_price': '245.50', 'amount': '245.50'},
+        ]
+
+    def test_dates_in_report_text(self):
+        """Test that long-form dates are normalised to ISO format."""
+        assert field_extraction.extract_dates(SAMPLE_EXTRACTED_TEXT) == ['2025-09-19']
+
+    def test_uncategorised_documents_have_no_fields(self):
+        """Test that categories without rules evaluate nothing."""
+        assert len(extract_fields(SAMPLE_EXTRACTED_TEXT, 'report')) == 0
+        assert len(extract_fields(SAMPLE_EXTRACTED_TEXT, None)) == 0
+
+    def test_fields_are_evaluated_lazily(self, monkeypatch):
+        """Test that only fields that are read are computed."""
+        calls = []
+        monkeypatch.setitem(field_extraction.EXTRACTORS, 'line_items',
+                            lambda text: calls.append(text) or [])
+
+        fields = extract_fields(SAMPLE_INVOICE_TEXT, 'invoice')
+        assert fields['total'] == '2094.60'
+        assert calls == []
+
+        fields['line_items']
+        fields['line_items']
+        assert len(calls) == 1
+
+    def test_missing_fields(self):
+        """Test reporting required fields that were not found locally."""
+        complete = extract_fields(SAMPLE_INVOICE_TEXT, 'invoice')
+        incomplete = extract_fields('Invoice\nThank you for your business', 'invoice')
+
+        assert missing_fields(complete, 'invoice') == []
+        assert missing_fields(incomplete, 'invoice') == ['invoice_number', 'total']
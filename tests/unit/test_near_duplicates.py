@@ -0,0 +1,109 @@
+import pytest
+import array
+import random
+import sys
+import os
+import time
+
+# Add src to path so we can import our service modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+from services.near_duplicates import LSHIndex, MinHasher, similarity
+from tests.fixtures.mock_data import SAMPLE_EXTRACTED_TEXT, SAMPLE_INVOICE_TEXT
+
+# The sample invoice as it might come back from a rescan: OCR noise in one line
+RESCANNED_INVOICE_TEXT = SAMPLE_INVOICE_TEXT.replace('Travel expenses', 'Trave1 expenses')
+
+
+def long_document(words=3000, seed=0):
+    rng = random.Random(seed)
+    return [f'word{rng.randrange(50000)}' for _ in range(words)]
+
+
+@pytest.fixture(scope='module')
+def minhasher():
+    return MinHasher()
+
+
+class TestMinHash:
+    """Test MinHash signatures."""
+
+    def test_identical_text_has_identical_signature(self, minhasher):
+        """Test that signatures are deterministic."""
+        assert minhasher.signature(SAMPLE_INVOICE_TEXT) == MinHasher().signature(SAMPLE_INVOICE_TEXT)
+
+    def test_similarity_tracks_text_overlap(self, minhasher):
+        """Test that near-identical texts score high and unrelated ones low."""
+        invoice = minhasher.signature(SAMPLE_INVOICE_TEXT)
+
+        assert similarity(invoice, minhasher.signature(RESCANNED_INVOICE_TEXT)) > 0.8
+        assert similarity(invoice, minhasher.signature(SAMPLE_EXTRACTED_TEXT)) < 0.2
+
+    def test_long_documents_are_sampled_consistently(self, minhasher):
+        """Test that capping the shingles keeps similar long documents similar."""
+        words = long_document()
+        edited = list(words)
+        for i in random.Random(1).sample(range(len(words)), 30):
+            edited[i] = 'noise'
+        original = minhasher.signature(' '.join(words))
+
+        assert similarity(original, minhasher.signature(' '.join(edited))) > 0.8
+        assert similarity(original, minhasher.signature(' '.join(long_document(seed=2)))) < 0.2
+
+    def test_signature_time_for_long_document(self, minhasher):
+        """Test that signing a 3,000-word document stays cheap."""
+        text = ' '.join(long_document())
+
+        start = time.perf_counter()
+        for _ in range(5):
+            minhasher.signature(text)
+        assert (time.perf_counter() - start) / 5 < 0.1
+
+    def test_empty_text_has_no_signature(self, minhasher):
+        """Test that documents without text are not signed."""
+        assert minhasher.signature('') is None
+
+
+class TestLSHIndex:
+    """Test the LSH index."""
+
+    def test_query_finds_near_duplicate(self, minhasher):
+        """Test that a rescanned document matches the original and its category."""
+        index = LSHIndex()
+        index.add('job-invoice', minhasher.signature(SAMPLE_INVOICE_TEXT), 'invoice')
+        index.add('job-report', minhasher.signature(SAMPLE_EXTRACTED_TEXT), 'report')
+
+        key, category, score = index.query(minhasher.signature(RESCANNED_INVOICE_TEXT))
+        assert (key, category) == ('job-invoice', 'invoice')
+        assert score > 0.8
+
+    def test_query_ignores_unrelated_documents(self, minhasher):
+        """Test that unrelated documents are not reported."""
+        index = LSHIndex()
+        index.add('job-report', minhasher.signature(SAMPLE_EXTRACTED_TEXT), 'report')
+
+        assert index.query(minhasher.signature(SAMPLE_INVOICE_TEXT)) is None
+
+    def test_adding_a_key_again_is_a_no_op(self, minhasher):
+        """Test that re-adding a document does not duplicate its bucket entries."""
+        signature = minhasher.signature(SAMPLE_INVOICE_TEXT)
+        index = LSHIndex()
+        index.add('job-1', signature, None)
+        index.add('job-1', signature, 'invoice')
+
+        assert len(index) == 1
+        assert all(bucket == ['job-1'] for band in index._buckets for bucket in band.values())
+        assert index.query(signature) == ('job-1', 'invoice', 1.0)
+
+    def test_query_time_with_large_index(self, minhasher):
+        """Test that lookups stay fast as the index grows."""
+        rng = random.Random(0)
+        index = LSHIndex()
+        for i in range(10000):
+            index.add(f'job-{i}', array.array('I', (rng.getrandbits(32) for _ in range(128))))
+        signature = minhasher.signature(RESCANNED_INVOICE_TEXT)
+
+        start = time.perf_counter()
+        for _ in range(100):
+            index.query(signature)
+        assert (time.perf_counter() - start) / 100 < 0.001
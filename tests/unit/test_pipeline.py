@@ -0,0 +1,122 @@
+import pytest
+import sys
+import os
+
+# Add src to path so we can import our service modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+from services import metadata_store
+from services.near_duplicates import MinHasher
+from services.pipeline import (
+    DocumentRejected, categorise_text, extract_pdf_text, get_duplicate_index,
+    process_document, scan_document, store_result,
+)
+from tests.fixtures.mock_data import SAMPLE_EXTRACTED_TEXT, SAMPLE_INVOICE_TEXT
+
+
+class TestPipelineStages:
+    """Test the individual pipeline stages."""
+
+    def test_scan_accepts_matching_content(self, tmp_path, sample_pdf):
+        """Test that files whose content matches the extension pass."""
+        path = tmp_path / 'doc.pdf'
+        path.write_bytes(sample_pdf.read())
+        scan_document(str(path))
+
+    def test_scan_rejects_mismatched_content(self, tmp_path):
+        """Test that renamed files are rejected."""
+        path = tmp_path / 'doc.png'
+        path.write_bytes(b'%PDF-1.4')
+        with pytest.raises(DocumentRejected):
+            scan_document(str(path))
+
+    def test_extract_pdf_text(self):
+        """Test reading the text layer of a simple PDF."""
+        data = b'stream\nBT (Hello \\(world\\)) Tj [(Invo) -20 (ice)] TJ ET\nendstream'
+        assert extract_pdf_text(data) == 'Hello (world)\nInvoice'
+
+    def test_categorise_text(self):
+        """Test keyword categorisation."""
+        assert categorise_text(SAMPLE_INVOICE_TEXT) == 'invoice'
+        assert categorise_text(SAMPLE_EXTRACTED_TEXT) == 'report'
+        assert categorise_text('') == 'other'
+
+    def test_process_document_reports_errors(self, tmp_path):
+        """Test that failures are returned rather than raised."""
+        result = process_document(str(tmp_path / 'missing.pdf'))
+        assert result['error'] is not None
+        assert result['category'] is None
+
+    def test_process_document_reports_malformed_sidecar(self, tmp_path):
+        """Test that unexpected errors from bad Textract output are reported too."""
+        path = tmp_path / 'scan.png'
+        path.write_bytes(b'\x89PNG\r\n\x1a\n\x00\x00')
+        (tmp_path / 'scan.png.textract.json').write_text(
+            '{"Blocks":[{"BlockType":"WORD","Text":"x","Confidence":"99"}]}'
+        )
+
+        result = process_document(str(path))
+
+        assert result['error'].startswith('TypeError')
+        assert result['category'] is None
+
+
+class TestDuplicateIndex:
+    """Test the long-lived duplicate index used by store_result."""
+
+    def _result(self, job_id, text):
+        return {'job_id': job_id, 'filename': f'{job_id}.pdf', 'file_size': 1, 'text': text,
+                'category': categorise_text(text), 'extraction': None,
+                'signature': MinHasher().signature(text), 'duplicate_of': None, 'error': None}
+
+    def test_index_is_reused_and_picks_up_other_writers(self, app):
+        """Test that one index serves every store and syncs rows it did not add."""
+        index = get_duplicate_index()
+        # Stored by another process: only visible through the metadata store
+        metadata_store.create_job('job-1', 'job-1.pdf', 'a@example.com', 1, status='completed',
+                                  category='invoice',
+                                  signature=MinHasher().signature(SAMPLE_INVOICE_TEXT).tobytes())
+
+        rescan = SAMPLE_INVOICE_TEXT.replace('Travel expenses', 'Trave1 expenses')
+        result = self._result('job-2', rescan)
+        store_result(result, 'a@example.com')
+
+        assert get_duplicate_index() is index
+        assert result['duplicate_of'] == 'job-1'
+        assert len(index.index) == 2
+
+        index.sync()
+        assert len(index.index) == 2
+
+    def test_late_commit_with_older_timestamp_is_indexed(self, app, monkeypatch):
+        """Test that a row committed after a sync is found even if its timestamp is older."""
+        from datetime import datetime
+        store_result(self._result('job-1', SAMPLE_EXTRACTED_TEXT), 'a@example.com')
+        index = get_duplicate_index()
+        assert len(index.index) == 1
+
+        # Another writer took its timestamp before job-1 but committed after it
+        class EarlyClock:
+            @staticmethod
+            def utcnow():
+                return datetime(2000, 1, 1)
+        monkeypatch.setattr(metadata_store, 'datetime', EarlyClock)
+        metadata_store.create_job('job-early', 'early.pdf', 'b@example.com', 1, status='completed',
+                                  category='invoice',
+                                  signature=MinHasher().signature(SAMPLE_INVOICE_TEXT).tobytes())
+        monkeypatch.undo()
+        assert metadata_store.get_job('job-early')['updated_at'] < metadata_store.get_job('job-1')['updated_at']
+
+        rescan = SAMPLE_INVOICE_TEXT.replace('Travel expenses', 'Trave1 expenses')
+        result = self._result('job-2', rescan)
+        store_result(result, 'a@example.com')
+
+        assert result['duplicate_of'] == 'job-early'
+
+    def test_deduplication_can_be_disabled(self, app):
+        """Test that deduplicate=False leaves the index untouched."""
+        result = self._result('job-1', SAMPLE_INVOICE_TEXT)
+        store_result(result, 'a@example.com', deduplicate=False)
+
+        assert 'duplicate_index' not in app.extensions
+        assert metadata_store.get_job('job-1')['signature'] is not None
@@ -113,6 +113,149 @@ class TestFlaskRoutes:
         assert 'status' in data
         assert 'message' in data
 
+    def test_status_for_uploaded_job(self, client):
+        """Test the status endpoint for a job recorded at upload."""
+        from services import metadata_store
+        metadata_store.create_job('job-uploaded', 'scan.pdf', 'test@example.com', 1024)
+        
+        response = client.get('/status/job-uploaded')
+        
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert data['status'] == 'uploaded'
+        assert data['filename'] == 'scan.pdf'
+        assert 'fields' not in data
+
+    def test_status_returns_invoice_fields(self, client):
+        """Test that extracted invoice fields are returned with the status."""
+        from services import metadata_store
+        from tests.fixtures.mock_data import SAMPLE_INVOICE_TEXT
+        metadata_store.create_job('job-invoice', 'invoice.pdf', 'test@example.com', 2048)
+        metadata_store.update_job('job-invoice', status='completed',
+                                  category='invoice', text=SAMPLE_INVOICE_TEXT)
+        
+        response = client.get('/status/job-invoice')
+        
+        data = json.loads(response.data)
+        assert data['category'] == 'invoice'
+        assert data['fields']['invoice_number'] == 'INV-2025-0042'
+        assert data['fields']['total'] == '2094.60'
+        assert len(data['fields']['line_items']) == 2
+        assert data['missing_fields'] == []
+
+    def test_status_flags_near_duplicates(self, client):
+        """Test that likely duplicates are flagged in the status response."""
+        from services import metadata_store
+        metadata_store.create_job('job-rescan', 'rescan.pdf', 'test@example.com', 2048,
+                                  status='completed', category='invoice',
+                                  duplicate_of='job-original', similarity=0.92)
+        
+        data = json.loads(client.get('/status/job-rescan').data)
+        
+        assert data['duplicate_of'] == 'job-original'
+        assert data['similarity'] == 0.92
+
+    def test_upload_is_processed_by_worker(self, app, client, monkeypatch):
+        """Test that queued uploads are drained and processed by a worker."""
+        from services.worker import ProcessingWorkers
+        workers = ProcessingWorkers(app, app.extensions['scheduler'], threads=1)
+        monkeypatch.setitem(app.config, 'PROCESSING_WORKERS', 1)
+        monkeypatch.setitem(app.extensions, 'workers', workers)
+        monkeypatch.setattr(workers, 'ensure_started', lambda: None)
+        pdf = b'%PDF-1.4\nstream\nBT (Invoice No: INV-9) Tj (Total Due: 10.00) Tj ET\nendstream'
+        data = {
+            'file': (BytesIO(pdf), 'queued.pdf'),
+            'email': 'Queue@Example.com'
+        }
+        client.post('/upload', data=data)
+        
+        job = workers.process_next(timeout=0)
+        
+        assert job.tenant == 'queue@example.com'
+        assert app.extensions['scheduler'].pending() == 0
+        status = json.loads(client.get(f'/status/{job.job_id}').data)
+        assert status['status'] == 'completed'
+        assert status['category'] == 'invoice'
+        assert status['fields']['invoice_number'] == 'INV-9'
+        
+        headers = {'Authorization': 'Bearer test-admin-token'}
+        metrics = json.loads(client.get('/metrics/scheduler', headers=headers).data)
+        tenant = metrics['tenants']['queue@example.com']
+        assert tenant['dispatched'] >= 1
+        assert tenant['in_flight'] == 0
+
+    def test_upload_not_queued_without_workers(self, app, client, sample_pdf):
+        """Test that uploads are not queued when no workers will drain them."""
+        pending = app.extensions['scheduler'].pending()
+        data = {
+            'file': (sample_pdf, 'test.pdf'),
+            'email': 'test@example.com'
+        }
+        client.post('/upload', data=data)
+        
+        assert app.extensions['scheduler'].pending() == pending
+
+    def test_scheduler_metrics_require_admin_token(self, client):
+        """Test that queue metrics are not public."""
+        assert client.get('/metrics/scheduler').status_code == 401
+        wrong = {'Authorization': 'Bearer wrong'}
+        assert client.get('/metrics/scheduler', headers=wrong).status_code == 401
+        right = {'Authorization': 'Bearer test-admin-token'}
+        assert client.get('/metrics/scheduler', headers=right).status_code == 200
+
+    def test_upload_rejected_when_backlog_full(self, app, client, sample_pdf, monkeypatch):
+        """Test that uploads are shed with 429 when the backlog is full."""
+        monkeypatch.setattr(app.extensions['admission'], 'max_backlog', 0)
+        data = {
+            'file': (sample_pdf, 'test.pdf'),
+            'email': 'test@example.com'
+        }
+        response = client.post('/upload', data=data)
+        
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '30'
+
+    def test_rejected_form_post_renders_page(self, app, client, sample_pdf, monkeypatch):
+        """Test that browsers get the upload page with a message, not raw JSON."""
+        monkeypatch.setattr(app.extensions['admission'], 'max_backlog', 0)
+        data = {
+            'file': (sample_pdf, 'test.pdf'),
+            'email': 'test@example.com'
+        }
+        response = client.post('/upload', data=data, headers={'Accept': 'text/html'})
+
+        assert response.status_code == 429
+        assert response.headers['Retry-After'] == '30'
+        assert response.mimetype == 'text/html'
+        assert b'Processing backlog is full' in response.data
+
+    def test_rejected_api_request_gets_json(self, app, client, sample_pdf, monkeypatch):
+        """Test that clients asking for JSON get a JSON 429."""
+        monkeypatch.setattr(app.extensions['admission'], 'max_backlog', 0)
+        data = {
+            'file': (sample_pdf, 'test.pdf'),
+            'email': 'test@example.com'
+        }
+        response = client.post('/upload', data=data, headers={'Accept': 'application/json'})
+
+        assert response.status_code == 429
+        assert response.get_json()['error'] == 'too_many_requests'
+
+    def test_rate_limit_keyed_on_forwarded_client(self, app, client, monkeypatch):
+        """Test that behind a trusted proxy each forwarded client has its own bucket."""
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        monkeypatch.setattr(app, 'wsgi_app', ProxyFix(app.wsgi_app, x_for=1))
+        admission = app.extensions['admission']
+        monkeypatch.setattr(admission.rate_limiter, 'burst', 1)
+        monkeypatch.setattr(admission.rate_limiter, 'rate', 0.001)
+
+        def post(client_ip):
+            return client.post('/upload', data={}, headers={'X-Forwarded-For': client_ip})
+
+        assert post('203.0.113.1').status_code != 429
+        assert post('203.0.113.1').status_code == 429
+        assert post('203.0.113.2').status_code != 429
+
     def test_404_error_handler(self, client):
         """Test 404 error handling."""
         response = client.get('/nonexistent-page')
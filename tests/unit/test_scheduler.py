@@ -0,0 +1,115 @@
+import pytest
+import sys
+import os
+
+# Add src to path so we can import our service modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+from services.scheduler import (
+    FairScheduler, classify_upload,
+    PRIORITY_FAST, PRIORITY_NORMAL, PRIORITY_BULK,
+)
+
+
+class FakeClock:
+    """Manually advanced clock for deterministic wait times."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestFairScheduler:
+    """Test priority and fair-share scheduling."""
+
+    def test_fast_lane_served_first(self):
+        """Test that fast-lane jobs are dispatched before normal and bulk jobs."""
+        scheduler = FairScheduler(max_in_flight_per_tenant=10)
+        scheduler.submit('bulk-1', 'a@example.com', PRIORITY_BULK)
+        scheduler.submit('normal-1', 'a@example.com', PRIORITY_NORMAL)
+        scheduler.submit('fast-1', 'b@example.com', PRIORITY_FAST)
+
+        order = [scheduler.next_job(timeout=0).job_id for _ in range(3)]
+        assert order == ['fast-1', 'normal-1', 'bulk-1']
+
+    def test_round_robin_between_tenants(self):
+        """Test that a bulk submitter does not starve other tenants."""
+        scheduler = FairScheduler(max_in_flight_per_tenant=100)
+        for i in range(5):
+            scheduler.submit(f'bulk-{i}', 'bulk@example.com')
+        scheduler.submit('user-1', 'user@example.com')
+
+        first_two = {scheduler.next_job(timeout=0).job_id for _ in range(2)}
+        assert 'user-1' in first_two
+
+    def test_tenant_weights(self):
+        """Test weighted round robin gives heavier tenants more turns."""
+        scheduler = FairScheduler(max_in_flight_per_tenant=100,
+                                  tenant_weights={'heavy@example.com': 3})
+        for i in range(6):
+            scheduler.submit(f'heavy-{i}', 'heavy@example.com')
+            scheduler.submit(f'light-{i}', 'light@example.com')
+
+        tenants = [scheduler.next_job(timeout=0).tenant for _ in range(8)]
+        assert tenants.count('heavy@example.com') == 6
+        assert tenants.count('light@example.com') == 2
+
+    def test_in_flight_quota(self):
+        """Test that tenants at their quota are skipped until a job finishes."""
+        scheduler = FairScheduler(max_in_flight_per_tenant=1)
+        scheduler.submit('a-1', 'a@example.com')
+        scheduler.submit('a-2', 'a@example.com')
+
+        job = scheduler.next_job(timeout=0)
+        assert scheduler.next_job(timeout=0) is None
+        assert scheduler.pending() == 1
+
+        scheduler.task_done(job)
+        assert scheduler.next_job(timeout=0).job_id == 'a-2'
+
+    def test_wait_time_metrics(self):
+        """Test per-tenant wait time reporting."""
+        clock = FakeClock()
+        scheduler = FairScheduler(clock=clock)
+        scheduler.submit('a-1', 'a@example.com', PRIORITY_FAST)
+        scheduler.submit('a-2', 'a@example.com', PRIORITY_NORMAL)
+        clock.now = 2.5
+        scheduler.next_job(timeout=0)
+
+        metrics = scheduler.metrics()
+        tenant = metrics['tenants']['a@example.com']
+        assert metrics['pending'] == 1
+        assert metrics['queued_by_priority'] == {'fast': 0, 'normal': 1, 'bulk': 0}
+        assert tenant['dispatched'] == 1
+        assert tenant['in_flight'] == 1
+        assert tenant['avg_wait_seconds'] == pytest.approx(2.5)
+        assert tenant['oldest_queued_seconds'] == pytest.approx(2.5)
+
+
+class TestClassifyUpload:
+    """Test priority classification of uploaded files."""
+
+    def test_small_image_is_fast(self, tmp_path):
+        """Test that small images are fast-laned."""
+        path = tmp_path / 'scan.png'
+        path.write_bytes(b'\x89PNG')
+        assert classify_upload(str(path), 4) == PRIORITY_FAST
+
+    def test_single_page_pdf_is_fast(self, tmp_path, sample_pdf):
+        """Test that small single-page PDFs are fast-laned."""
+        path = tmp_path / 'doc.pdf'
+        path.write_bytes(sample_pdf.read())
+        assert classify_upload(str(path), path.stat().st_size) == PRIORITY_FAST
+
+    def test_multi_page_pdf_is_normal(self, tmp_path):
+        """Test that multi-page PDFs get normal priority."""
+        path = tmp_path / 'doc.pdf'
+        path.write_bytes(b'%PDF-1.4 /Type /Pages /Type /Page /Type /Page')
+        assert classify_upload(str(path), path.stat().st_size) == PRIORITY_NORMAL
+
+    def test_large_file_is_bulk(self, tmp_path):
+        """Test that large files are treated as bulk work."""
+        path = tmp_path / 'big.tiff'
+        assert classify_upload(str(path), 10 * 1024 * 1024) == PRIORITY_BULK
@@ -0,0 +1,130 @@
+import pytest
+import json
+import sys
+import os
+import time
+
+# Add src to path so we can import our service modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+from services import tracing
+from services.pipeline import process_document
+
+
+def read_spans(path):
+    """Return the spans in an OTLP/JSON lines file, keyed by name."""
+    spans = {}
+    with open(path) as f:
+        for line in f:
+            for resource_spans in json.loads(line)['resourceSpans']:
+                for scope_spans in resource_spans['scopeSpans']:
+                    for span in scope_spans['spans']:
+                        spans[span['name']] = span
+    return spans
+
+
+@pytest.fixture
+def trace_path(tmp_path):
+    """Enable tracing to a temporary file for one test."""
+    path = tmp_path / 'traces.jsonl'
+    tracing.configure(export_path=str(path))
+    yield path
+    tracing.configure()
+
+
+class TestTracing:
+    """Test span recording and export."""
+
+    def test_nested_spans_share_job_trace(self, trace_path):
+        """Test that child spans inherit the job's trace and parent span."""
+        tracer = tracing.get_tracer()
+        job_id = '3f1c2a9e-8f5b-4c1d-9a3e-2b7d6c5e4f10'
+        with tracer.span('pipeline', job_id=job_id):
+            with tracer.span('pipeline.scan') as span:
+                span.set_attribute('file.size', 10)
+
+        spans = read_spans(trace_path)
+        root, child = spans['pipeline'], spans['pipeline.scan']
+        assert root['traceId'] == child['traceId'] == job_id.replace('-', '')
+        assert child['parentSpanId'] == root['spanId']
+        assert 'parentSpanId' not in root
+        attributes = {a['key']: a['value'] for a in child['attributes']}
+        assert attributes['job.id'] == {'stringValue': job_id}
+        assert attributes['file.size'] == {'intValue': '10'}
+
+    def test_errors_are_recorded(self, trace_path):
+        """Test that exceptions mark the span as failed and propagate."""
+        with pytest.raises(ValueError):
+            with tracing.get_tracer().span('pipeline.extract', job_id='job-1'):
+                raise ValueError('bad file')
+
+        span = read_spans(trace_path)['pipeline.extract']
+        assert span['status'] == {'code': tracing.STATUS_ERROR, 'message': 'ValueError: bad file'}
+
+    def test_pipeline_stages_are_traced(self, trace_path, tmp_path, sample_pdf):
+        """Test that each pipeline stage produces a span."""
+        path = tmp_path / 'doc.pdf'
+        path.write_bytes(sample_pdf.read())
+
+        result = process_document(str(path))
+
+        spans = read_spans(trace_path)
+        assert {'pipeline', 'pipeline.scan', 'pipeline.extract', 'pipeline.categorise'} <= set(spans)
+        assert spans['pipeline']['traceId'] == tracing.trace_id_for_job(result['job_id'])
+
+    def test_upload_phases_are_traced(self, trace_path, client, sample_pdf):
+        """Test that upload request phases produce spans."""
+        client.post('/upload', data={'file': (sample_pdf, 'test.pdf'),
+                                     'email': 'test@example.com'})
+
+        spans = read_spans(trace_path)
+        assert {'upload', 'upload.validate', 'upload.save', 'upload.record'} <= set(spans)
+
+    def test_disabled_tracer_is_noop(self):
+        """Test that spans cost nothing when tracing is off."""
+        tracing.configure()
+        with tracing.get_tracer().span('pipeline') as span:
+            span.set_attribute('ignored', True)
+
+
+class TestSlowJobProfiler:
+    """Test the opt-in sampling profiler."""
+
+    def test_slow_job_is_profiled(self, tmp_path):
+        """Test that jobs over the threshold write a folded-stack profile."""
+        tracing.configure(profile_threshold=0.05, profile_folder=str(tmp_path))
+        try:
+            with tracing.get_tracer().span('pipeline', job_id='slow-job', profile=True):
+                deadline = time.perf_counter() + 0.1
+                while time.perf_counter() < deadline:
+                    pass
+        finally:
+            tracing.configure()
+
+        profile = (tmp_path / 'slow-job.pipeline.folded').read_text()
+        assert 'test_slow_job_is_profiled' in profile
+
+    def test_profiles_of_one_job_do_not_overwrite(self, tmp_path):
+        """Test that the upload and pipeline spans of a job get separate profiles."""
+        tracing.configure(profile_threshold=0.01, profile_folder=str(tmp_path))
+        try:
+            for name in ('upload', 'pipeline'):
+                with tracing.get_tracer().span(name, job_id='job-1', profile=True):
+                    deadline = time.perf_counter() + 0.05
+                    while time.perf_counter() < deadline:
+                        pass
+        finally:
+            tracing.configure()
+
+        assert sorted(os.listdir(tmp_path)) == ['job-1.pipeline.folded', 'job-1.upload.folded']
+
+    def test_fast_job_is_not_profiled(self, tmp_path):
+        """Test that jobs under the threshold leave no profile."""
+        tracing.configure(profile_threshold=10, profile_folder=str(tmp_path))
+        try:
+            with tracing.get_tracer().span('pipeline', job_id='fast-job', profile=True):
+                time.sleep(0.02)
+        finally:
+            tracing.configure()
+
+        assert not (tmp_path / 'fast-job.pipeline.folded').exists()
@@ -0,0 +1,80 @@
+import pytest
+import sys
+import os
+import time
+
+# Add src to path so we can import our service modules
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'src'))
+
+from services import metadata_store
+from services.scheduler import FairScheduler
+from services.worker import ProcessingWorkers
+from tests.fixtures.mock_data import SAMPLE_INVOICE_TEXT, make_pdf
+
+
+class TestProcessingWorkers:
+    """Test the threads draining the processing queue."""
+
+    def test_threads_drain_queue(self, app, tmp_path, sample_pdf):
+        """Test that started workers process queued jobs and release slots."""
+        path = tmp_path / 'doc.pdf'
+        path.write_bytes(sample_pdf.read())
+        metadata_store.create_job('job-1', 'doc.pdf', 'a@example.com', path.stat().st_size)
+        scheduler = FairScheduler()
+        scheduler.submit('job-1', 'a@example.com', payload=str(path))
+
+        workers = ProcessingWorkers(app, scheduler, threads=2, poll_interval=0.01)
+        workers.ensure_started()
+        try:
+            deadline = time.monotonic() + 5
+            while metadata_store.get_job('job-1')['status'] != 'completed':
+                assert time.monotonic() < deadline, 'job was not processed'
+                time.sleep(0.01)
+        finally:
+            workers.stop(timeout=1)
+
+        tenant = scheduler.metrics()['tenants']['a@example.com']
+        assert scheduler.pending() == 0
+        assert tenant['dispatched'] == 1
+        assert tenant['in_flight'] == 0
+
+    def test_failures_release_tenant_slot(self, app, monkeypatch):
+        """Test that a job that raises still calls task_done()."""
+        import services.worker
+        def fail(path, job_id=None):
+            raise RuntimeError('boom')
+        monkeypatch.setattr(services.worker, 'process_document', fail)
+        scheduler = FairScheduler(max_in_flight_per_tenant=1)
+        scheduler.submit('job-1', 'a@example.com', payload='missing.pdf')
+        scheduler.submit('job-2', 'a@example.com', payload='missing.pdf')
+
+        workers = ProcessingWorkers(app, scheduler, threads=1)
+        assert workers.process_next(timeout=0).job_id == 'job-1'
+        assert workers.process_next(timeout=0).job_id == 'job-2'
+
+    def test_worker_flags_near_duplicate_uploads(self, app, tmp_path):
+        """Test that uploads processed by workers are checked for near-duplicates."""
+        scheduler = FairScheduler()
+        texts = {'job-1': SAMPLE_INVOICE_TEXT,
+                 'job-2': SAMPLE_INVOICE_TEXT.replace('Travel expenses', 'Trave1 expenses')}
+        for job_id, text in texts.items():
+            path = tmp_path / f'{job_id}.pdf'
+            path.write_bytes(make_pdf(text))
+            metadata_store.create_job(job_id, path.name, 'a@example.com', path.stat().st_size)
+            scheduler.submit(job_id, 'a@example.com', payload=str(path))
+
+        workers = ProcessingWorkers(app, scheduler, threads=1)
+        workers.process_next(timeout=0)
+        workers.process_next(timeout=0)
+
+        duplicate = metadata_store.get_job('job-2')
+        assert duplicate['duplicate_of'] == 'job-1'
+        assert duplicate['category'] == 'invoice'
+        assert metadata_store.get_job('job-1')['duplicate_of'] is None
+
+    def test_disabled_workers_start_nothing(self, app):
+        """Test that zero threads means no workers are started."""
+        workers = ProcessingWorkers(app, FairScheduler(), threads=0)
+        workers.ensure_started()
+        assert not workers.enabled
+        assert workers._workers == []